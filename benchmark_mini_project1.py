@@ -0,0 +1,389 @@
+### Benchmarks for mini_project1
+# Writes deterministic synthetic vcf files and times the mini_project1 pipeline on them.
+#
+#     python benchmark_mini_project1.py --variants 1000 100000 --samples 12 --output results.json
+#     python benchmark_mini_project1.py --compare old.json results.json
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import os
+import pickle
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import mini_project1
+
+
+# ANNOVAR-style annotation keys written between the GATK keys and ALLELE_END, with a
+# function drawing a value for each of them.
+ANNOVAR_FIELDS = [
+    ('Func.refGene', lambda rnd: rnd.choice(['exonic', 'intronic', 'UTR3', 'splicing', 'intergenic'])),
+    ('Gene.refGene', lambda rnd: 'GENE%d' % rnd.randint(1, 2000)),
+    ('GeneDetail.refGene', lambda rnd: 'NM_%06d:exon%d:c.%d-%dA>G' % (rnd.randint(1, 999999), rnd.randint(1, 30),
+                                                                     rnd.randint(1, 3000), rnd.randint(1, 50))),
+    ('ExonicFunc.refGene', lambda rnd: rnd.choice(['synonymous_SNV', 'nonsynonymous_SNV', 'stopgain'])),
+    ('AAChange.refGene', lambda rnd: 'GENE%d:NM_%06d:exon%d:c.G%dA:p.R%dQ' % (rnd.randint(1, 2000), rnd.randint(1, 999999),
+                                                                            rnd.randint(1, 30), rnd.randint(1, 3000),
+                                                                            rnd.randint(1, 1000))),
+    ('cytoBand', lambda rnd: '%dq%d.%d' % (rnd.randint(1, 22), rnd.randint(1, 40), rnd.randint(1, 9))),
+    ('genomicSuperDups', lambda rnd: 'Score\\x3d%.6f\\x3bName\\x3dchr%d:%d' % (rnd.random(), rnd.randint(1, 22), rnd.randint(1, 10 ** 8))),
+    ('esp6500siv2_all', lambda rnd: '%.6f' % rnd.random()),
+    ('1000g2015aug_all', lambda rnd: '%.6f' % rnd.random()),
+    ('ExAC_ALL', lambda rnd: '%.3e' % rnd.random()),
+    ('avsnp147', lambda rnd: 'rs%d' % rnd.randint(1, 10 ** 9)),
+    ('SIFT_score', lambda rnd: '%.3f' % rnd.random()),
+    ('SIFT_pred', lambda rnd: rnd.choice('DT')),
+    ('Polyphen2_HDIV_score', lambda rnd: '%.3f' % rnd.random()),
+    ('Polyphen2_HDIV_pred', lambda rnd: rnd.choice('DPB')),
+    ('Polyphen2_HVAR_score', lambda rnd: '%.3f' % rnd.random()),
+    ('Polyphen2_HVAR_pred', lambda rnd: rnd.choice('DPB')),
+    ('LRT_score', lambda rnd: '%.3f' % rnd.random()),
+    ('LRT_pred', lambda rnd: rnd.choice('DNU')),
+    ('MutationTaster_score', lambda rnd: '%.3f' % rnd.random()),
+    ('MutationTaster_pred', lambda rnd: rnd.choice('ADNP')),
+    ('MutationAssessor_score', lambda rnd: '%.3f' % (rnd.random() * 5)),
+    ('MutationAssessor_pred', lambda rnd: rnd.choice('HMLN')),
+    ('FATHMM_score', lambda rnd: '%.2f' % (rnd.random() * 10 - 5)),
+    ('FATHMM_pred', lambda rnd: rnd.choice('DT')),
+    ('PROVEAN_score', lambda rnd: '%.2f' % (rnd.random() * 10 - 5)),
+    ('PROVEAN_pred', lambda rnd: rnd.choice('DN')),
+    ('VEST3_score', lambda rnd: '%.3f' % rnd.random()),
+    ('CADD_raw', lambda rnd: '%.3f' % (rnd.random() * 10)),
+    ('CADD_phred', lambda rnd: '%.1f' % (rnd.random() * 40)),
+    ('DANN_score', lambda rnd: '%.3f' % rnd.random()),
+    ('MetaSVM_score', lambda rnd: '%.3f' % (rnd.random() * 2 - 1)),
+    ('MetaSVM_pred', lambda rnd: rnd.choice('DT')),
+    ('MetaLR_score', lambda rnd: '%.3f' % rnd.random()),
+    ('MetaLR_pred', lambda rnd: rnd.choice('DT')),
+    ('integrated_fitCons_score', lambda rnd: '%.3f' % rnd.random()),
+    ('GERP++_RS', lambda rnd: '%.2f' % (rnd.random() * 12 - 6)),
+    ('phyloP100way_vertebrate', lambda rnd: '%.3f' % (rnd.random() * 10 - 2)),
+    ('SiPhy_29way_logOdds', lambda rnd: '%.3f' % (rnd.random() * 20)),
+    ('Interpro_domain', lambda rnd: rnd.choice(['Protein_kinase', 'Zinc_finger\\x2c_C2H2', 'Immunoglobulin'])),
+    ('CLINSIG', lambda rnd: rnd.choice(['Benign', 'Pathogenic', 'Uncertain_significance'])),
+    ('cosmic70', lambda rnd: 'ID\\x3dCOSM%d\\x3bOCCURENCE\\x3d1(skin)' % rnd.randint(1, 10 ** 7)),
+]
+
+CHROMOSOMES = ['chr%d' % i for i in range(1, 23)] + ['chrX']
+BASES = 'ACGT'
+
+
+def sample_names(n_samples):
+    """
+    Returns n_samples names following the XG naming of the course data: XG102, XG103,
+    XG104, XG202, ...
+    """
+    return ['XG%d%02d' % (i // 3 + 1, i % 3 + 2) for i in range(n_samples)]
+
+
+def _synthetic_line(rnd, chrom, pos, n_samples, info_density):
+    ref = rnd.choice(BASES)
+    alt = rnd.choice([b for b in BASES if b != ref])
+    ac = rnd.randint(1, 2 * max(n_samples, 1))
+    info = ['AC=%d' % ac, 'AF=%.3f' % rnd.random(), 'AN=%d' % (2 * n_samples),
+            'BaseQRankSum=%.3f' % (rnd.random() * 4 - 2), 'DP=%d' % rnd.randint(10, 5000),
+            'FS=%.3f' % (rnd.random() * 10), 'MQ=%.2f' % (50 + rnd.random() * 10),
+            'QD=%.2f' % (rnd.random() * 30), 'SOR=%.3f' % (rnd.random() * 3),
+            'culprit=%s' % rnd.choice(['MQ', 'FS', 'QD', 'SOR']), 'ANNOVAR_DATE=2016-02-01']
+    for key, value in ANNOVAR_FIELDS:
+        info.append('%s=%s' % (key, value(rnd) if rnd.random() < info_density else '.'))
+    info.append('ALLELE_END')
+    samples = []
+    for _ in range(n_samples):
+        gt = rnd.choice(['0/0', '0/0', '0/1', '0|1', '1/1', './.'])
+        ref_depth, alt_depth = rnd.randint(0, 60), rnd.randint(0, 60)
+        samples.append('%s:%d,%d:%d:%d:%d,%d,%d' % (gt, ref_depth, alt_depth, ref_depth + alt_depth,
+                                                    rnd.randint(0, 99), rnd.randint(0, 2000),
+                                                    rnd.randint(0, 200), rnd.randint(0, 2000)))
+    fields = [chrom, str(pos), '.', ref, alt, '%.2f' % (rnd.random() * 5000),
+              'PASS' if rnd.random() < 0.8 else 'VQSRTrancheSNP99.90to100.00', ';'.join(info)]
+    if n_samples:
+        fields.append('GT:AD:DP:GQ:PL')
+    return '\t'.join(fields + samples) + '\n'
+
+
+def write_synthetic_vcf(filename, n_variants, n_samples=12, info_density=1.0, seed=0):
+    """
+    Writes a position-sorted vcf with n_variants lines spread over the chromosomes, the GATK
+    and ANNOVAR info layout of the course data and n_samples XG sample columns.
+    info_density is the fraction of ANNOVAR keys that get a value (the others are '.').
+    The output only depends on the arguments, so the same call always writes the same
+    file (gzip output is written with a zero timestamp for the same reason). A filename 
+    ending in .gz is gzipped. Returns the size of the file in bytes.
+    """
+    rnd = random.Random(seed)
+    per_chrom = -(-n_variants // len(CHROMOSOMES)) if n_variants else 0
+    if filename.endswith('.gz'):
+        out = io.TextIOWrapper(gzip.GzipFile(filename, 'wb', mtime=0), encoding='utf-8')
+    else:
+        out = open(filename, 'w')
+    with out:
+        out.write('##fileformat=VCFv4.2\n')
+        out.write('##source=benchmark_mini_project1 n_variants=%d n_samples=%d info_density=%g seed=%d\n'
+                  % (n_variants, n_samples, info_density, seed))
+        for chrom in CHROMOSOMES:
+            out.write('##contig=<ID=%s>\n' % chrom)
+        header = ['#CHROM', 'POS', 'ID', 'REF', 'ALT', 'QUAL', 'FILTER', 'INFO']
+        if n_samples:
+            header += ['FORMAT'] + sample_names(n_samples)
+        out.write('\t'.join(header) + '\n')
+        written = 0
+        for chrom in CHROMOSOMES:
+            pos = 10000
+            batch = []
+            for _ in range(min(per_chrom, n_variants - written)):
+                pos += rnd.randint(1, 2000)
+                batch.append(_synthetic_line(rnd, chrom, pos, n_samples, info_density))
+                if len(batch) == 1000:
+                    out.write(''.join(batch))
+                    batch = []
+            out.write(''.join(batch))
+            written = min(written + per_chrom, n_variants)
+    return os.path.getsize(filename)
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _pick_queries(records, n_queries, seed):
+    rnd = random.Random(seed)
+    if not records:
+        return []
+    return [(r['CHROM'], r['REF'], r['ALT'], r['POS']) for r in rnd.sample(records, min(n_queries, len(records)))]
+
+
+def _info_field_data_types(data):
+    # infer_info_field_data_types does it in one pass; older versions of mini_project1 only 
+    # have the list-based functions, which give the same types
+    if hasattr(mini_project1, 'infer_info_field_data_types'):
+        return mini_project1.infer_info_field_data_types(mini_project1.iter_info_field(data))
+    info = mini_project1.create_dictionary_of_info_field_values(mini_project1.extract_info_field(data))
+    return mini_project1.determine_data_type_of_info_fields(info)
+
+
+def _inputs_filename(stage, workdir):
+    return os.path.join(workdir, '%s.inputs.pickle' % stage)
+
+
+def _prepare_stage(stage, filename, workdir, n_queries=100, seed=0):
+    # Runs in its own worker process before the stage and leaves the inputs of the stage in 
+    # workdir, so the memory used to build them does not count in the peak RSS of the stage.
+    json_filename = os.path.join(workdir, 'formatted.json')
+    if stage in ('read_vcf_file', 'gzip_pipeline'):
+        return
+    data = mini_project1.read_vcf_file(filename)
+    types = _info_field_data_types(data)
+    if stage == 'format_data':
+        inputs = (data, types)
+    else:
+        data = mini_project1.format_data(data, types)
+        if stage == 'save_data_as_json':
+            inputs = data
+        else:
+            mini_project1.save_data_as_json(data, json_filename)
+            if os.path.exists(json_filename + '.idx'):
+                os.remove(json_filename + '.idx')
+            if stage == 'build_variant_index':
+                return
+            inputs = _pick_queries(data, n_queries, seed)
+            if hasattr(mini_project1, 'build_variant_index'):
+                mini_project1.build_variant_index(json_filename)
+    with open(_inputs_filename(stage, workdir), 'wb') as file:
+        pickle.dump(inputs, file, pickle.HIGHEST_PROTOCOL)
+
+
+def _run_stage(stage, filename, workdir, n_queries=100, seed=0):
+    # Runs in its own worker process, so the peak RSS is the one of this stage and its inputs, 
+    # which _prepare_stage left in workdir. Loading them is not timed, and input_rss_mb is 
+    # the peak RSS once they are loaded. Stages whose functions the imported mini_project1 
+    # does not have give None.
+    json_filename = os.path.join(workdir, 'formatted.json')
+    inputs = None
+    if os.path.exists(_inputs_filename(stage, workdir)):
+        with open(_inputs_filename(stage, workdir), 'rb') as file:
+            inputs = pickle.load(file)
+        os.remove(_inputs_filename(stage, workdir))
+    result = {'seconds': None, 'records': None, 'input_rss_mb': _peak_rss_mb()}
+    start = time.perf_counter()
+    if stage == 'read_vcf_file':
+        records = len(mini_project1.read_vcf_file(filename))
+    elif stage == 'format_data':
+        records = len(mini_project1.format_data(*inputs))
+    elif stage == 'save_data_as_json':
+        mini_project1.save_data_as_json(inputs, json_filename)
+        records = len(inputs)
+    elif stage == 'build_variant_index':
+        if not hasattr(mini_project1, 'build_variant_index'):
+            result['peak_rss_mb'] = _peak_rss_mb()
+            return result
+        records = mini_project1.build_variant_index(json_filename)
+        records = len(records) if hasattr(records, '__len__') else None
+    elif stage == 'find_variant':
+        for query in inputs:
+            mini_project1.find_variant(*query, json_filename)
+        records = result['queries'] = len(inputs)
+    elif stage == 'gzip_pipeline':
+        # both versions end with the predictor fields in mini_project1_gzip.json
+        output = os.path.join(workdir, 'mini_project1_gzip.json')
+        if hasattr(mini_project1, 'predictor_fields_from_vcf'):
+            variants = mini_project1.predictor_fields_from_vcf(filename)
+            mini_project1.save_data_as_json(variants, output)
+            records = len(variants)
+        else:
+            # the old version writes to the working directory and prints every record
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            try:
+                with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+                    mini_project1.pull_basic_and_predictor_fields_gzip(filename)
+            finally:
+                os.chdir(cwd)
+            records = None
+    else:
+        raise ValueError('unknown stage %r' % stage)
+    result['seconds'] = time.perf_counter() - start
+    if records is None and stage == 'gzip_pipeline':
+        records = len(mini_project1.load_data_from_json(output))
+    result['records'] = records
+    result['peak_rss_mb'] = _peak_rss_mb()
+    return result
+
+
+STAGES = ['read_vcf_file', 'format_data', 'save_data_as_json', 'build_variant_index', 'find_variant',
+          'gzip_pipeline']
+# Stages that only run on the gzipped copy of a file; the others run on the plain one.
+GZIP_STAGES = {'gzip_pipeline'}
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(variant_counts, n_samples=12, info_density=1.0, seed=0, stages=None, workdir=None,
+                   n_queries=100, keep=False):
+    """
+    Writes a plain and a gzipped synthetic vcf for every variant count and times every
+    stage on them, each stage in a fresh worker process. Returns the results as a
+    JSON-serializable dictionary: the parameters, the environment and, for every file and
+    stage, the seconds, records, lines/s, MB/s (of the vcf that was read), peak RSS in MB and
+    the part of it taken by the inputs of the stage, which are built beforehand in another
+    worker process. A stage the imported mini_project1 cannot run has None seconds.
+    """
+    stages = stages or STAGES
+    own_workdir = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix='bench_mini_project1_')
+    os.makedirs(workdir, exist_ok=True)
+    results = {'revision': _git_revision(), 'python': platform.python_version(),
+               'platform': platform.platform(), 'cpus': os.cpu_count(),
+               'parameters': {'variants': list(variant_counts), 'samples': n_samples,
+                              'info_density': info_density, 'seed': seed, 'queries': n_queries},
+               'runs': []}
+    try:
+        for n_variants in variant_counts:
+            plain = os.path.join(workdir, 'synthetic_%d.vcf' % n_variants)
+            start = time.perf_counter()
+            plain_bytes = write_synthetic_vcf(plain, n_variants, n_samples, info_density, seed)
+            generate_seconds = time.perf_counter() - start
+            compressed = plain + '.gz'
+            with open(plain, 'rb') as src, gzip.GzipFile(compressed, 'wb', mtime=0) as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            run = {'variants': n_variants, 'plain_bytes': plain_bytes,
+                   'gzip_bytes': os.path.getsize(compressed), 'generate_seconds': generate_seconds,
+                   'stages': {}}
+            for stage in stages:
+                filename = compressed if stage in GZIP_STAGES else plain
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    pool.submit(_prepare_stage, stage, filename, workdir, n_queries, seed).result()
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    result = pool.submit(_run_stage, stage, filename, workdir, n_queries, seed).result()
+                seconds = result['seconds']
+                run['stages'][stage] = result
+                if seconds is None:
+                    print('%10d variants  %-20s not available' % (n_variants, stage), file=sys.stderr)
+                    continue
+                if stage != 'find_variant':
+                    result['lines_per_s'] = n_variants / seconds if seconds else None
+                    result['mb_per_s'] = plain_bytes / (1024 * 1024) / seconds if seconds else None
+                else:
+                    result['queries_per_s'] = result['queries'] / seconds if seconds else None
+                print('%10d variants  %-20s %9.3f s  %8.1f MB peak  %8.1f MB inputs'
+                      % (n_variants, stage, seconds, result['peak_rss_mb'], result['input_rss_mb']), file=sys.stderr)
+            results['runs'].append(run)
+    finally:
+        if own_workdir and not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare_results(old, new):
+    """
+    Prints the speed-up of every stage of new over old (old seconds / new seconds) for
+    the variant counts present in both result dictionaries.
+    """
+    old_runs = {run['variants']: run for run in old['runs']}
+    for run in new['runs']:
+        previous = old_runs.get(run['variants'])
+        if previous is None:
+            continue
+        for stage, result in run['stages'].items():
+            before = previous['stages'].get(stage)
+            if before is None or not before['seconds'] or not result['seconds']:
+                continue
+            print('%10d variants  %-20s %8.3f s -> %8.3f s  x%.2f  rss %8.1f -> %8.1f MB'
+                  % (run['variants'], stage, before['seconds'], result['seconds'],
+                     before['seconds'] / result['seconds'], before['peak_rss_mb'], result['peak_rss_mb']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the mini_project1 vcf pipeline on synthetic data.')
+    parser.add_argument('--variants', type=int, nargs='+', default=[1000, 10000],
+                        help='variant counts to generate (default: 1000 10000)')
+    parser.add_argument('--samples', type=int, default=12, help='number of XG sample columns')
+    parser.add_argument('--info-density', type=float, default=1.0,
+                        help='fraction of ANNOVAR info keys that have a value')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stages', nargs='+', choices=STAGES, help='stages to run (default: all)')
+    parser.add_argument('--queries', type=int, default=100, help='number of find_variant lookups')
+    parser.add_argument('--workdir', help='directory for the generated files (default: a temporary one)')
+    parser.add_argument('--keep', action='store_true', help='keep the generated files')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--generate', metavar='FILENAME',
+                        help='only write one synthetic vcf (gzipped if it ends in .gz) for the first count')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as old, open(args.compare[1]) as new:
+            compare_results(json.load(old), json.load(new))
+        return
+    if args.generate:
+        write_synthetic_vcf(args.generate, args.variants[0], args.samples, args.info_density, args.seed)
+        return
+    results = run_benchmarks(args.variants, args.samples, args.info_density, args.seed, args.stages,
+                             args.workdir, args.queries, args.keep)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,33 @@
 from collections import defaultdict
+from collections.abc import Mapping, Sequence, Sized
+from contextlib import contextmanager
+import codecs
+import gzip
+import hashlib
+import heapq
 import json
+import math
+import operator
+import os
+import queue
+import re
+import shutil
+import sqlite3
+from sqlite3 import Error
+import struct
+import threading
+import time
+import zlib
+
+
+PREDICTOR_FIELDS = {'FATHMM_pred', 'LRT_pred', 'MetaLR_pred', 'MetaSVM_pred',
+                    'MutationAssessor_pred', 'MutationTaster_pred', 'PROVEAN_pred', 'Polyphen2_HDIV_pred',
+                    'Polyphen2_HVAR_pred', 'SIFT_pred'}
+
+# Weight of every prediction value for every predictor, used to compute sum_predictor_values.
+# Values that are not listed count 0. MutationTaster uses M and P differently, so they do not count there.
+PREDICTOR_WEIGHTS = {pred: {'A': 1, 'H': 1, 'D': 1, 'M': 0.5, 'P': 0.5, 'L': 0.25} for pred in PREDICTOR_FIELDS}
+PREDICTOR_WEIGHTS['MutationTaster_pred'] = {'A': 1, 'H': 1, 'D': 1, 'L': 0.25}
 
 
 def determine_data_type(value):
@@ -33,17 +61,45 @@ def determine_data_type_of_list(values):
 
     """
     # BEGIN SOLUTION
-    x = []
-    for value in values:
-        y = determine_data_type(value)
-        x.append(y)
-    if str in x:
-        return str
-    elif float in x:
-        return float
-    else:
+    return determine_data_type_of_values(values)
+    # END SOLUTION
+
+
+_INT_LITERAL = re.compile(r'[+-]?\d{1,300}')
+_FLOAT_LITERAL = re.compile(r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+_DIGIT = re.compile(r'\d')
+
+
+def _classify_value(value):
+    if _INT_LITERAL.fullmatch(value):
         return int
-    pass
+    if _FLOAT_LITERAL.fullmatch(value):
+        f = float(value)
+        if math.isinf(f):
+            return str
+        return int if f.is_integer() else float
+    if not _DIGIT.search(value):
+        return str
+    return determine_data_type(value)
+
+
+def determine_data_type_of_values(values):
+    """
+    Batched version of determine_data_type_of_list. Takes a list (or any iterable) of strings 
+    and returns their unified data type in one pass. Plain numeric literals are classified 
+    with precompiled regular expressions instead of try/except around float() and int(), and 
+    the scan stops as soon as a str is seen since nothing can change the answer after that.
+    Only unusual spellings such as ' 1' or '1_000' fall back to determine_data_type.
+    """
+    # BEGIN SOLUTION
+    result = int
+    for value in values:
+        t = _classify_value(value)
+        if t is str:
+            return str
+        if t is float:
+            result = float
+    return result
     # END SOLUTION
 
 
@@ -252,50 +308,1196 @@ def create_dict_from_line(header, line):
                       'PL': '0,51,1827'}}}
     """
     # BEGIN SOLUTION
-    mydict=(dict(zip(header,line.split('\t'))))
-    from collections import defaultdict
-    dict1=defaultdict(str)
-    dict2=defaultdict(str)
-    list2=['XG102','XG103','XG104','XG202','XG203','XG204','XG302','XG303','XG304','XG402','XG403','XG404']
-    for k,v in mydict.items():
-        if k in list2:
-            dict1.update({k:v})
+    return _schema_for_header(header).parse_line(line)
+    # END SOLUTION
+
+
+class SymbolTable:
+    """
+    Per-file table of interned strings. intern returns one shared object for every equal 
+    string, so keys such as the info field names repeated on every line are stored once. 
+    intern_value does the same for values no longer than max_length, which keeps short, 
+    repetitive values ('0/1', 'PASS', chromosome names, gene symbols) shared without 
+    filling the table with long unique strings. len() is the number of unique strings.
+    """
+
+    def __init__(self, max_length=32):
+        self.max_length = max_length
+        self._symbols = {}
+
+    def intern(self, value):
+        return self._symbols.setdefault(value, value)
+
+    def intern_value(self, value):
+        if len(value) > self.max_length:
+            return value
+        return self._symbols.setdefault(value, value)
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def __contains__(self, value):
+        return value in self._symbols
+
+    def __repr__(self):
+        return 'SymbolTable(%d strings)' % len(self._symbols)
+
+
+class VcfSchema:
+    """
+    Record layout compiled once from the #CHROM header of a vcf. It holds the names and 
+    column indexes of the fixed fields, the slice of sample columns that follows FORMAT, 
+    and a cache of the key tuple for every FORMAT string seen so far, so parse_line only 
+    has to split the line and index into it. Works for any set of sample columns.
+    """
+
+    def __init__(self, header):
+        self.header = list(header)
+        if 'FORMAT' in self.header:
+            self.format_index = self.header.index('FORMAT')
+            self.fixed_fields = tuple(self.header[:self.format_index])
+            self.sample_names = tuple(self.header[self.format_index + 1:])
         else:
-            dict2.update({k:v})
-    del dict2['FORMAT']
-    dict2['SAMPLE']=format_sample_fields('GT:AD:DP:GQ:PL',dict1)
-    return dict2
-    pass
+            self.format_index = None
+            self.fixed_fields = tuple(self.header)
+            self.sample_names = ()
+        self.field_index = {k: i for i, k in enumerate(self.fixed_fields)}
+        self.sample_index = {k: i for i, k in enumerate(self.sample_names)}
+        self._variant_index = tuple(self.field_index.get(name) for name in Variant.FIELDS)
+        self._format_keys = {}
+        self._sample_values = {}
+        self._projections = {}
+
+    def format_keys(self, format_field):
+        keys = self._format_keys.get(format_field)
+        if keys is None:
+            keys = self._format_keys[format_field] = tuple(format_field.split(':'))
+        return keys
+
+    def parse_line(self, line, lazy=False, symbols=None):
+        columns = line.split('\t')
+        if symbols is None:
+            record = dict(zip(self.fixed_fields, columns))
+        else:
+            intern = symbols.intern_value
+            record = {name: value if name in ('POS', 'INFO') else intern(value)
+                      for name, value in zip(self.fixed_fields, columns)}
+        samples = {}
+        if self.format_index is not None and len(columns) > self.format_index:
+            keys = self.format_keys(columns[self.format_index])
+            if lazy:
+                samples = LazySamples(self, keys, columns[self.format_index + 1:])
+            elif symbols is None:
+                for name, sample in zip(self.sample_names, columns[self.format_index + 1:]):
+                    samples[name] = dict(zip(keys, sample.split(':')))
+            else:
+                for name, sample in zip(self.sample_names, columns[self.format_index + 1:]):
+                    samples[name] = dict(zip(keys, [intern(v) for v in sample.split(':')]))
+        record['SAMPLE'] = samples
+        return record
+
+    def parse_bytes(self, line, lazy=False, symbols=None):
+        return self.parse_line(line.decode('utf-8'), lazy, symbols)
+
+    def parse_variant(self, line):
+        columns = line.split('\t')
+        n = len(columns)
+        values = [columns[i] if i is not None and i < n else '' for i in self._variant_index]
+        if self.format_index is not None and n > self.format_index:
+            keys = self.format_keys(columns[self.format_index])
+            shared = self._sample_values
+            samples = tuple([tuple([shared.setdefault(v, v) if len(v) <= 4 else v for v in sample.split(':')])
+                             for sample in columns[self.format_index + 1:]])
+            return Variant(*values, format_keys=keys, sample_names=self.sample_names, samples=samples)
+        return Variant(*values)
+
+    def projection(self, fields):
+        key = tuple(fields)
+        projection = self._projections.get(key)
+        if projection is None:
+            projection = self._projections[key] = FieldProjection(self, fields)
+        return projection
+
+
+class FieldProjection:
+    """
+    Parser for a subset of the columns of a vcf, compiled from a list of field names:
+
+        'CHROM', 'POS', ...      a fixed column
+        'INFO'                   the whole info string
+        'INFO/<key>'             one info field
+        'SAMPLE'                 every FORMAT key of every sample
+        'SAMPLE/<name>'          one sample
+        'FORMAT/<key>'           one FORMAT key (of every sample unless samples are named)
+
+    The line is only split up to the last column that is needed, info fields are found in 
+    the raw info string without splitting it, and only the requested samples and FORMAT 
+    keys are split, so unrequested data is never split or cast. parse_line returns the same 
+    shape as VcfSchema.parse_line restricted to the requested fields; INFO is a raw string 
+    holding only the requested keys, so it can go through the rest of the pipeline as usual. 
+    parse_bytes does the same on an undecoded line and only decodes the columns, info values 
+    and samples that end up in the record.
+    """
+
+    def __init__(self, schema, fields):
+        self.schema = schema
+        self.fixed = []
+        self.info_keys = []
+        self.all_info = False
+        format_keys = []
+        sample_names = []
+        all_samples = False
+        for field in fields:
+            kind, sep, name = field.partition('/')
+            if not sep and field == 'INFO':
+                self.all_info = True
+            elif not sep and field == 'SAMPLE':
+                all_samples = True
+            elif not sep and field in schema.field_index:
+                self.fixed.append((field, schema.field_index[field]))
+            elif kind == 'INFO' and name:
+                self.info_keys.append(name)
+            elif kind == 'FORMAT' and name:
+                format_keys.append(name)
+            elif kind == 'SAMPLE' and name in schema.sample_index:
+                sample_names.append(name)
+            else:
+                raise ValueError('unknown field %r' % field)
+        self.fixed.sort(key=lambda item: item[1])
+        self.info_index = schema.field_index.get('INFO') if self.all_info or self.info_keys else None
+        self.format_keys = None if all_samples or not format_keys else tuple(format_keys)
+        if sample_names and not all_samples:
+            names = sorted(sample_names, key=schema.sample_index.get)
+        elif all_samples or format_keys:
+            names = schema.sample_names
+        else:
+            names = ()
+        self.samples = [(name, schema.format_index + 1 + schema.sample_index[name]) for name in names] \
+            if schema.format_index is not None else []
+        needed = [i for _, i in self.fixed]
+        if self.info_index is not None:
+            needed.append(self.info_index)
+        if self.samples:
+            needed.append(self.samples[-1][1])
+        self.maxsplit = max(needed) + 1 if needed else 0
+        self._info_needles = [(k, k.encode('utf-8')) for k in self.info_keys]
+        self._format_plans = {}
+
+    def _format_plan(self, format_field):
+        plan = self._format_plans.get(format_field)
+        if plan is None:
+            keys = self.schema.format_keys(format_field)
+            wanted = keys if self.format_keys is None else [k for k in self.format_keys if k in keys]
+            plan = self._format_plans[format_field] = tuple((k, keys.index(k)) for k in wanted)
+        return plan
+
+    def parse_line(self, line, lazy=False, symbols=None):
+        columns = line.split('\t', self.maxsplit)
+        n = len(columns)
+        intern = symbols.intern_value if symbols is not None else None
+        record = {}
+        for name, i in self.fixed:
+            if i < n:
+                record[name] = columns[i] if intern is None or name == 'POS' else intern(columns[i])
+        if self.info_index is not None and self.info_index < n:
+            raw = columns[self.info_index]
+            if self.all_info:
+                record['INFO'] = raw
+            else:
+                items = []
+                for k in self.info_keys:
+                    v = _info_raw_value(raw, k)
+                    if v is not None:
+                        items.append(k + '=' + v)
+                record['INFO'] = ';'.join(items)
+        if self.samples:
+            samples = {}
+            if self.schema.format_index < n:
+                plan = self._format_plan(columns[self.schema.format_index])
+                for name, i in self.samples:
+                    if i >= n:
+                        break
+                    values = columns[i].split(':')
+                    samples[name] = {k: values[j] if intern is None else intern(values[j])
+                                     for k, j in plan if j < len(values)}
+            record['SAMPLE'] = samples
+        return record
+
+    def parse_bytes(self, line, lazy=False, symbols=None):
+        columns = line.split(b'\t', self.maxsplit)
+        n = len(columns)
+        intern = symbols.intern_value if symbols is not None else None
+        record = {}
+        for name, i in self.fixed:
+            if i < n:
+                value = columns[i].decode('utf-8')
+                record[name] = value if intern is None or name == 'POS' else intern(value)
+        if self.info_index is not None and self.info_index < n:
+            raw = columns[self.info_index]
+            if self.all_info:
+                record['INFO'] = raw.decode('utf-8')
+            else:
+                items = []
+                for k, needle in self._info_needles:
+                    v = _info_raw_value(raw, needle)
+                    if v is not None:
+                        items.append(k + '=' + v.decode('utf-8'))
+                record['INFO'] = ';'.join(items)
+        if self.samples:
+            samples = {}
+            if self.schema.format_index < n:
+                plan = self._format_plan(columns[self.schema.format_index].decode('utf-8'))
+                for name, i in self.samples:
+                    if i >= n:
+                        break
+                    values = columns[i].decode('utf-8').split(':')
+                    samples[name] = {k: values[j] if intern is None else intern(values[j])
+                                     for k, j in plan if j < len(values)}
+            record['SAMPLE'] = samples
+        return record
+
+
+class VariantFilter:
+    """
+    Predicate on the raw lines of a vcf. It is checked before a line is parsed, so lines 
+    that are rejected never build a dictionary. The conditions are:
+
+        regions     a region string or a list of them, as taken by parse_region
+        pass_only   keep only the lines whose FILTER is PASS
+        min_qual    lowest QUAL kept (inclusive); a missing QUAL fails
+        max_qual    highest QUAL kept (inclusive); a missing QUAL fails
+        info        dictionary of INFO key -> test, where the test is None (the key is 
+                    present), a value (equal to it), an (op, value) tuple with op one of 
+                    == != < <= > >=, or a function of the raw string
+
+    The cheap checks come first: a prefix check on CHROM, the POS column, and a substring 
+    check for every INFO key. Only the lines that pass them have their columns split, 
+    once, up to INFO. Numbers are compared as floats and everything else as strings. 
+    matches also takes an undecoded bytes line, as MappedVcf reads it. Keep the tests 
+    free of lambdas when the filter goes to parse_vcf_parallel, since it has to be pickled.
+    """
+
+    def __init__(self, regions=None, pass_only=False, min_qual=None, max_qual=None, info=None):
+        if isinstance(regions, str):
+            regions = [regions]
+        self.regions = {}
+        for region in regions or ():
+            chrom, start, end = parse_region(region)
+            alternative = chrom[3:] if chrom.startswith('chr') else 'chr' + chrom
+            for name in (chrom, alternative):
+                self.regions.setdefault(name + '\t', []).append((start, end))
+        self.prefixes = tuple(self.regions)
+        self.pass_only = pass_only
+        self.min_qual = min_qual
+        self.max_qual = max_qual
+        self.info = []
+        for key, test in (info or {}).items():
+            if test is not None and not callable(test) and not isinstance(test, tuple):
+                test = ('==', test)
+            if isinstance(test, tuple) and test[0] not in _COMPARISONS:
+                raise ValueError('unknown comparison %r' % (test[0],))
+            self.info.append((key, key + '=', test))
+        self.split_columns = pass_only or min_qual is not None or max_qual is not None or bool(self.info)
+        # the literals of matches for a str line and for an undecoded bytes line, where the 
+        # info values are only decoded for the tests that are not numeric comparisons
+        regions = {k.encode('utf-8'): v for k, v in self.regions.items()}
+        self._syntax = {
+            str: ('\t', 'PASS', self.prefixes, self.regions,
+                  [(key, needle, test, False) for key, needle, test in self.info]),
+            bytes: (b'\t', b'PASS', tuple(regions), regions,
+                    [(key.encode('utf-8'), needle.encode('utf-8'), test, not self._numeric(test))
+                     for key, needle, test in self.info]),
+        }
+
+    @staticmethod
+    def _numeric(test):
+        return test is None or isinstance(test, tuple) and isinstance(test[1], (int, float)) and \
+            not isinstance(test[1], bool)
+
+    @staticmethod
+    def _test(test, raw):
+        if test is None:
+            return True
+        if callable(test):
+            return test(raw)
+        op, value = test
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            try:
+                raw = float(raw)
+            except ValueError:
+                return False
+        return _COMPARISONS[op](raw, value)
+
+    def matches(self, line):
+        tab_char, passed, prefixes, regions, info = self._syntax[type(line)]
+        if prefixes:
+            if not line.startswith(prefixes):
+                return False
+            tab = line.find(tab_char)
+            end = line.find(tab_char, tab + 1)
+            try:
+                pos = int(line[tab + 1:end if end >= 0 else len(line)])
+            except ValueError:
+                return False
+            for start, stop in regions[line[:tab + 1]]:
+                if (start is None or pos >= start) and (stop is None or pos <= stop):
+                    break
+            else:
+                return False
+        for _, needle, _, _ in info:
+            if needle not in line:
+                return False
+        if not self.split_columns:
+            return True
+        columns = line.split(tab_char, 8)
+        if len(columns) < 8:
+            return False
+        if self.pass_only and columns[6] != passed:
+            return False
+        if self.min_qual is not None or self.max_qual is not None:
+            try:
+                qual = float(columns[5])
+            except ValueError:
+                return False
+            if (self.min_qual is not None and qual < self.min_qual) or \
+                    (self.max_qual is not None and qual > self.max_qual):
+                return False
+        for key, _, test, decode in info:
+            value = _info_raw_value(columns[7], key)
+            if value is None or not self._test(test, value.decode('utf-8') if decode else value):
+                return False
+        return True
+
+
+_COMPARISONS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt,
+                '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+
+_MISSING = object()
+
+
+def _info_raw_value(raw, key):
+    # raw and key are both str, or both bytes for an undecoded info column
+    if isinstance(raw, bytes):
+        separator, needle, missing = b';', key + b'=', b'.'
+    else:
+        separator, needle, missing = ';', key + '=', '.'
+    end = len(raw)
+    while True:
+        i = raw.rfind(separator + needle, 0, end)
+        if i >= 0:
+            i += 1
+        elif raw.startswith(needle):
+            i = 0
+        else:
+            return None
+        j = raw.find(separator, i)
+        value = raw[i + len(needle):j if j >= 0 else len(raw)]
+        if value != missing:
+            return value
+        if i == 0:
+            return None
+        end = i - 1
+
+
+class LazyInfo(Mapping):
+    """
+    Read-only mapping over a raw info string that casts a key only when it is looked up. 
+    It behaves like the INFO dictionary built by format_data: keys without a value or 
+    with the value '.' are missing, and when a key is repeated the last value wins. 
+    Iterating over it or taking its length decodes the whole string. With cache=True the 
+    decoded values are kept so every key is split and cast at most once.
+    """
+
+    __slots__ = ('raw', 'info_field_data_type', 'cache', '_values', '_decoded')
+
+    def __init__(self, raw, info_field_data_type, cache=True):
+        self.raw = raw
+        self.info_field_data_type = info_field_data_type
+        self.cache = cache
+        self._values = {}
+        self._decoded = None
+
+    def _decode(self):
+        if self._decoded is not None:
+            return self._decoded
+        decoded = {}
+        for item in self.raw.split(';'):
+            k, sep, v = item.partition('=')
+            if sep and v != '.':
+                decoded[k] = self.info_field_data_type[k](v)
+        if self.cache:
+            self._decoded = decoded
+        return decoded
+
+    def _lookup(self, key):
+        if self._decoded is not None:
+            return self._decoded.get(key, _MISSING)
+        value = self._values.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = _info_raw_value(self.raw, key)
+        value = _MISSING if value is None else self.info_field_data_type[key](value)
+        if self.cache:
+            self._values[key] = value
+        return value
+
+    def __getitem__(self, key):
+        value = self._lookup(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self._lookup(key) is not _MISSING
+
+    def __iter__(self):
+        return iter(self._decode())
+
+    def __len__(self):
+        return len(self._decode())
+
+    def __repr__(self):
+        return 'LazyInfo(%r)' % self.raw
+
+
+class LazySamples(Mapping):
+    """
+    Read-only mapping from sample name to that sample's FORMAT dictionary. It keeps the raw 
+    sample columns of one line and splits a sample only when it is looked up.
+    """
+
+    __slots__ = ('schema', 'keys_', 'columns', 'cache', '_values')
+
+    def __init__(self, schema, keys, columns, cache=True):
+        self.schema = schema
+        self.keys_ = keys
+        self.columns = columns
+        self.cache = cache
+        self._values = {}
+
+    def __getitem__(self, name):
+        if name in self._values:
+            return self._values[name]
+        i = self.schema.sample_index[name]
+        if i >= len(self.columns):
+            raise KeyError(name)
+        value = dict(zip(self.keys_, self.columns[i].split(':')))
+        if self.cache:
+            self._values[name] = value
+        return value
+
+    def __contains__(self, name):
+        i = self.schema.sample_index.get(name)
+        return i is not None and i < len(self.columns)
+
+    def __iter__(self):
+        return iter(self.schema.sample_names[:len(self.columns)])
+
+    def __len__(self):
+        return min(len(self.schema.sample_names), len(self.columns))
+
+    def __repr__(self):
+        return 'LazySamples(%r)' % dict(self)
+
+
+class Variant:
+    """
+    Compact row-oriented variant. The fixed vcf columns are slots instead of dictionary 
+    entries, and the samples are stored as one tuple of values per sample, aligned to a 
+    FORMAT key tuple and a sample name tuple that every variant from the same file shares. 
+    Fields can be read as attributes or, like the dictionaries, as variant['CHROM'], and 
+    to_dict and from_dict convert to and from the dictionary shape used everywhere else.
+    Short sample values such as '0/1' or '99' are shared between variants of a file.
+    """
+
+    FIELDS = ('CHROM', 'POS', 'ID', 'REF', 'ALT', 'QUAL', 'FILTER', 'INFO')
+
+    __slots__ = FIELDS + ('format_keys', 'sample_names', 'samples')
+
+    def __init__(self, CHROM, POS, ID, REF, ALT, QUAL, FILTER, INFO,
+                 format_keys=(), sample_names=(), samples=()):
+        self.CHROM = CHROM
+        self.POS = POS
+        self.ID = ID
+        self.REF = REF
+        self.ALT = ALT
+        self.QUAL = QUAL
+        self.FILTER = FILTER
+        self.INFO = INFO
+        self.format_keys = format_keys
+        self.sample_names = sample_names
+        self.samples = samples
+
+    @classmethod
+    def from_dict(cls, record, sample_names=None, format_keys=None):
+        """
+        Builds a Variant from a dictionary made by create_dict_from_line or format_data. 
+        Pass the sample_names and format_keys tuples of a previous Variant to share them.
+        """
+        sample = record.get('SAMPLE') or {}
+        if sample_names is None:
+            sample_names = tuple(sample)
+        if format_keys is None:
+            keys = {}
+            for values in sample.values():
+                keys.update(dict.fromkeys(values))
+            format_keys = tuple(keys)
+        samples = tuple([tuple([sample[name].get(k) for k in format_keys]) if name in sample else None
+                         for name in sample_names])
+        return cls(*[record.get(name, '') for name in cls.FIELDS],
+                   format_keys=format_keys, sample_names=sample_names, samples=samples)
+
+    def sample_dict(self):
+        return {name: {k: v for k, v in zip(self.format_keys, values) if v is not None}
+                for name, values in zip(self.sample_names, self.samples) if values is not None}
+
+    def to_dict(self):
+        record = defaultdict(str)
+        for name in self.FIELDS:
+            value = getattr(self, name)
+            record[name] = dict(value) if isinstance(value, Mapping) else value
+        record['SAMPLE'] = self.sample_dict()
+        return record
+
+    def __getitem__(self, key):
+        if key == 'SAMPLE':
+            return self.sample_dict()
+        if key in self.FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __repr__(self):
+        return 'Variant(%r, %r, %r, %r)' % (self.CHROM, self.POS, self.REF, self.ALT)
+
+
+def _json_default(obj):
+    if isinstance(obj, Variant):
+        return obj.to_dict()
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError('Object of type %s is not JSON serializable' % type(obj).__name__)
+
+
+_schema_cache = {}
+
+
+def _schema_for_header(header):
+    key = tuple(header)
+    schema = _schema_cache.get(key)
+    if schema is None:
+        schema = _schema_cache[key] = VcfSchema(header)
+    return schema
+
+
+class StageCounters:
+    """
+    Counters of one run of a pipeline stage, filled in by the stage while it runs.
+    """
+    __slots__ = ('records_in', 'records_out', 'bytes')
+
+    def __init__(self):
+        self.records_in = 0
+        self.records_out = 0
+        self.bytes = 0
+
+
+class PipelineProfile:
+    """
+    Per-stage instrumentation for the pipeline functions that take a profile argument 
+    (read_vcf_file, iter_vcf, infer_info_field_data_types, format_data, save_data_as_json, 
+    predictor_fields_from_vcf, ...). Every stage records its wall time, records in and out, 
+    and bytes (uncompressed text read, or written for serialization). The stages are:
+
+        read / decompress   reading (and gunzipping) the vcf into decoded lines
+        filter              VariantFilter checks on the raw lines
+        parse               building the record dictionaries from the lines
+        infer_types         info field data type inference
+        format              casting in format_data
+        score               predictor scoring in predictor_fields_from_vcf
+        serialize           JSON output in save_data_as_json
+
+    With trace_allocations=True, the stages that run as a block (not the per-line 
+    read/filter/parse stages) are traced with tracemalloc, which is stopped again after the 
+    stage unless it was already running, and also record the memory they allocated and 
+    their peak. on_event, if given, is called with every event dictionary as it is 
+    recorded. summary() aggregates the events per stage and report() formats the summary 
+    as a table. When no profile is passed the pipeline functions take their usual code 
+    path, so the hooks cost nothing.
+    """
+
+    def __init__(self, trace_allocations=False, on_event=None):
+        self.trace_allocations = trace_allocations
+        self.on_event = on_event
+        self.events = []
+
+    def add(self, stage, seconds, records_in=0, records_out=0, bytes=0, allocated=None, peak_allocated=None):
+        """
+        Records one event for stage.
+        """
+        event = {'stage': stage, 'seconds': seconds, 'records_in': records_in,
+                 'records_out': records_out, 'bytes': bytes}
+        if allocated is not None:
+            event['allocated'] = allocated
+            event['peak_allocated'] = peak_allocated
+        self.events.append(event)
+        if self.on_event is not None:
+            self.on_event(event)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager timing a block as one event of stage name. It yields a 
+        StageCounters for the block to fill in.
+        """
+        counters = StageCounters()
+        tracing = started = False
+        if self.trace_allocations:
+            import tracemalloc
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            tracing = True
+        start = time.perf_counter()
+        try:
+            yield counters
+        finally:
+            seconds = time.perf_counter() - start
+            allocated = peak = None
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                allocated = current - before
+                peak -= before
+                if started:
+                    tracemalloc.stop()
+            self.add(name, seconds, counters.records_in, counters.records_out, counters.bytes, allocated, peak)
+
+    def summary(self):
+        """
+        Returns a dictionary of stage -> totals over its events (calls, seconds, records 
+        in and out, bytes, and allocations when traced) plus records/s and MB/s, in the 
+        order the stages were first seen.
+        """
+        totals = {}
+        for event in self.events:
+            total = totals.get(event['stage'])
+            if total is None:
+                total = totals[event['stage']] = {'calls': 0, 'seconds': 0.0, 'records_in': 0,
+                                                  'records_out': 0, 'bytes': 0}
+            total['calls'] += 1
+            for key in ('seconds', 'records_in', 'records_out', 'bytes'):
+                total[key] += event[key]
+            if 'allocated' in event:
+                total['allocated'] = total.get('allocated', 0) + event['allocated']
+                total['peak_allocated'] = max(total.get('peak_allocated', 0), event['peak_allocated'])
+        for total in totals.values():
+            seconds = total['seconds']
+            records = max(total['records_in'], total['records_out'])
+            total['records_per_s'] = records / seconds if seconds else None
+            total['mb_per_s'] = total['bytes'] / 1048576 / seconds if seconds and total['bytes'] else None
+        return totals
+
+    def report(self):
+        """
+        Returns the summary as a text table, one line per stage.
+        """
+        lines = ['%-12s %6s %10s %12s %12s %10s %12s' % ('stage', 'calls', 'seconds', 'records in',
+                                                          'records out', 'MB', 'alloc MB')]
+        for stage, total in self.summary().items():
+            allocated = total.get('allocated')
+            lines.append('%-12s %6d %10.3f %12d %12d %10.1f %12s' % (
+                stage, total['calls'], total['seconds'], total['records_in'], total['records_out'],
+                total['bytes'] / 1048576, '-' if allocated is None else '%.1f' % (allocated / 1048576)))
+        return '\n'.join(lines)
+
+
+@contextmanager
+def _stage(profile, name):
+    if profile is None:
+        yield StageCounters()
+    else:
+        with profile.stage(name) as counters:
+            yield counters
+
+
+def _profiled_parse(profile, read_stage, lines, parser, where=None, lazy=False, symbols=None):
+    # Same as the plain loop over lines in iter_vcf, timing the line reading, filtering and 
+    # parsing of every line separately. The totals are recorded when the generator ends.
+    clock = time.perf_counter
+    lines = iter(lines)
+    read = check = parse = 0.0
+    n_lines = n_kept = n_bytes = 0
+    try:
+        while True:
+            t0 = clock()
+            line = next(lines, None)
+            t1 = clock()
+            read += t1 - t0
+            if line is None:
+                break
+            n_lines += 1
+            n_bytes += len(line) + 1
+            if where is not None:
+                keep = where.matches(line)
+                t2 = clock()
+                check += t2 - t1
+                t1 = t2
+                if not keep:
+                    continue
+            n_kept += 1
+            record = parser.parse_line(line, lazy, symbols)
+            parse += clock() - t1
+            yield record
+    finally:
+        profile.add(read_stage, read, records_out=n_lines, bytes=n_bytes)
+        if where is not None:
+            profile.add('filter', check, records_in=n_lines, records_out=n_kept)
+        profile.add('parse', parse, records_in=n_kept, records_out=n_kept)
+
+
+def _is_gzip(filename):
+    with open(filename, 'rb') as file:
+        return file.read(2) == b'\x1f\x8b'
+
+
+GZIP_BATCH_BYTES = 1 << 20
+
+
+class ThreadedGzipReader:
+    """
+    Line reader for a gzipped file (plain gzip, BGZF or any concatenation of gzip members) 
+    whose decompression runs in a background thread. The thread reads batch_bytes of 
+    compressed input at a time, inflates it with zlib (which releases the GIL), cuts the 
+    result after its last newline and puts the bytes in a queue holding at most queue_size 
+    batches, so memory stays bounded when the parser falls behind. NUL padding between or 
+    after the members is skipped, as gzip.open does. The bytes are only decoded when the 
+    consumer takes the batch, one call per batch. Iterating over the reader yields the lines 
+    of the file without their newline; use it in a with statement, or call close(), to stop 
+    the thread when the lines are not all consumed.
+    """
+
+    def __init__(self, filename, batch_bytes=GZIP_BATCH_BYTES, queue_size=8):
+        self._batches = queue.Queue(queue_size)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._inflate, args=(filename, batch_bytes), daemon=True)
+        self._thread.start()
+        self._lines = self._iter_lines()
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _inflate(self, filename, batch_bytes):
+        try:
+            # decompressor is None between gzip members, where NUL padding is skipped the way 
+            # gzip.open does it
+            decompressor = None
+            tail = b''
+            with open(filename, 'rb') as file:
+                while not self._stop.is_set():
+                    raw = file.read(batch_bytes)
+                    if not raw:
+                        break
+                    parts = [tail]
+                    while raw:
+                        if decompressor is None:
+                            raw = raw.lstrip(b'\x00')
+                            if not raw:
+                                break
+                            decompressor = zlib.decompressobj(31)
+                        parts.append(decompressor.decompress(raw))
+                        if decompressor.eof:
+                            raw = decompressor.unused_data
+                            decompressor = None
+                        else:
+                            raw = b''
+                    data = b''.join(parts)
+                    cut = data.rfind(b'\n') + 1
+                    tail = data[cut:]
+                    if cut:
+                        self._put(data[:cut])
+            if decompressor is not None and not self._stop.is_set():
+                raise EOFError('Compressed file ended before the end-of-stream marker was reached')
+            if tail:
+                self._put(tail)
+            self._put(None)
+        except BaseException as e:
+            self._put(e)
+
+    def _iter_lines(self):
+        while True:
+            batch = self._batches.get()
+            if batch is None:
+                return
+            if isinstance(batch, BaseException):
+                raise batch
+            lines = batch.decode('utf-8').split('\n')
+            if not lines[-1]:
+                lines.pop()
+            yield from lines
+
+    def __iter__(self):
+        return self._lines
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _open_vcf(filename, threaded=False):
+    if _is_gzip(filename):
+        if threaded:
+            return ThreadedGzipReader(filename)
+        return gzip.open(filename, 'rt')
+    return open(filename, 'r')
+
+
+def _read_vcf_header(fs):
+    for line in fs:
+        line =line.strip()
+        if not line:
+            continue
+        if line.startswith('##'):
+            continue
+        return VcfSchema(line[1:].split('\t'))
+    return None
+
+
+def _iter_data_lines(fs):
+    for line in fs:
+        line =line.strip()
+        if not line:
+            continue
+        yield line
+
+
+def _iter_vcf_lines(fs):
+    schema=_read_vcf_header(fs)
+    for line in _iter_data_lines(fs):
+        yield schema, line
+
+
+class MappedVcf:
+    """
+    Reader for an uncompressed vcf backed by mmap. The data lines are scanned as bytes, 
+    finding each newline in the mapping and taking the line out of it with a single slice. 
+    Nothing is decoded before it is needed: a VariantFilter checks the undecoded line, and 
+    the line is then parsed with parse_bytes, so a projection (see FieldProjection) only 
+    splits the columns it needs and only decodes the values that go into the record. 
+    Every line is addressed by the byte offset of its first character, which gives random 
+    access for index-driven lookups:
+
+        with MappedVcf('lab1_data.vcf') as vcf:
+            offsets = list(vcf.offsets())
+            record = vcf.record_at(offsets[1000], fields=['CHROM', 'POS', 'INFO/SIFT_pred'])
+    """
+
+    def __init__(self, filename):
+        import mmap
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        if os.path.getsize(filename):
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._map = b''
+        self.schema = None
+        self.data_offset = len(self._map)
+        for start, line in self._lines(0):
+            if line.startswith(b'##'):
+                continue
+            self.schema = VcfSchema(line[1:].decode('utf-8').split('\t'))
+            self.data_offset = self._map.find(b'\n', start) + 1 or len(self._map)
+            break
+
+    def _lines(self, start, end=None):
+        # (offset, stripped bytes) of every non-blank line starting in [start, end); strip 
+        # returns the slice itself unless there is whitespace around the line
+        mm = self._map
+        find = mm.find
+        size = len(mm)
+        end = size if end is None else min(end, size)
+        while start < end:
+            cut = find(b'\n', start)
+            if cut < 0:
+                cut = size
+            line = mm[start:cut].strip()
+            if line:
+                yield start, line
+            start = cut + 1
+
+    def _align(self, start):
+        # the first line start at or after start, never inside the header
+        if start <= self.data_offset:
+            return self.data_offset
+        if self._map[start - 1:start] != b'\n':
+            start = self._map.find(b'\n', start) + 1 or len(self._map)
+        return start
+
+    def _line(self, offset):
+        end = self._map.find(b'\n', offset)
+        return self._map[offset:end if end >= 0 else len(self._map)].strip()
+
+    def offsets(self, start=None, end=None):
+        """
+        Yields the byte offset of every data line starting in [start, end).
+        """
+        for offset, _ in self._lines(self._align(start or 0), end):
+            yield offset
+
+    def line_at(self, offset):
+        """
+        Returns the line starting at byte offset, decoded and stripped.
+        """
+        return self._line(offset).decode('utf-8')
+
+    def columns_at(self, offset, n_columns=None):
+        """
+        Returns the columns of the line starting at byte offset as a list of bytes, or only 
+        its first n_columns columns.
+        """
+        line = self._line(offset)
+        return line.split(b'\t') if n_columns is None else line.split(b'\t', n_columns)[:n_columns]
+
+    def record_at(self, offset, fields=None, lazy=False, symbols=None):
+        """
+        Parses the line starting at byte offset into a variant dictionary, or only the given 
+        fields.
+        """
+        parser = self.schema if fields is None else self.schema.projection(fields)
+        return parser.parse_bytes(self._line(offset), lazy, symbols)
+
+    def iter_records(self, fields=None, where=None, lazy=False, symbols=None, start=None, end=None):
+        """
+        Yields the records of the data lines starting in [start, end) (by default the whole 
+        file), like iter_vcf: fields restricts them to some columns and where, a 
+        VariantFilter, drops lines before they are parsed.
+        """
+        if self.schema is None:
+            return
+        parse = (self.schema if fields is None else self.schema.projection(fields)).parse_bytes
+        for _, line in self._lines(self._align(start or 0), end):
+            if where is None or where.matches(line):
+                yield parse(line, lazy, symbols)
+
+    def close(self):
+        if not isinstance(self._map, bytes):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_vcf(filename, lazy=False, symbols=None, fields=None, where=None, profile=None, threaded=False):
+    """
+    Generator version of read_vcf_file. The function reads the vcf file (plain or 
+    gzipped) one variant at a time and yields the dictionary 
+    built by create_dict_from_line, so only one record is held in memory at a time.
+    With lazy=True the SAMPLE field is a LazySamples mapping that splits a sample only 
+    when it is looked up. Pass a SymbolTable as symbols to intern the values of the records. 
+    fields restricts the records to the given columns (see FieldProjection), and only 
+    the lines accepted by where, a VariantFilter, are parsed. Pass a PipelineProfile as 
+    profile to time the read (or decompress), filter and parse stages. With threaded=True a 
+    gzipped file is decompressed in a background thread by a ThreadedGzipReader, while 
+    this thread parses.
+    """
+    # BEGIN SOLUTION
+    with _open_vcf(filename, threaded) as fs:
+        schema = _read_vcf_header(fs)
+        parser = schema if fields is None or schema is None else schema.projection(fields)
+        if profile is not None:
+            read_stage = 'decompress' if _is_gzip(filename) else 'read'
+            yield from _profiled_parse(profile, read_stage, _iter_data_lines(fs), parser, where, lazy, symbols)
+            return
+        for line in _iter_data_lines(fs):
+            if where is None or where.matches(line):
+                yield parser.parse_line(line, lazy, symbols)
     # END SOLUTION
 
 
-def read_vcf_file(filename):
+def _compact_info(info):
+    items = []
+    for item in info.split(';'):
+        _, sep, value = item.partition('=')
+        if sep and value != '.':
+            items.append(item)
+    return ';'.join(items)
+
+
+def iter_variants(filename, info_field_data_type=None):
+    """
+    Like iter_vcf but yields compact Variant objects instead of dictionaries. When 
+    info_field_data_type is given the variants are also formatted the way format_data 
+    does it: POS becomes an int, QUAL a float and INFO a LazyInfo over the raw string 
+    that casts keys on access without keeping a decoded copy.
+    """
+    # BEGIN SOLUTION
+    with _open_vcf(filename) as fs:
+        for schema, line in _iter_vcf_lines(fs):
+            variant = schema.parse_variant(line)
+            if info_field_data_type is not None:
+                variant.POS = int(variant.POS)
+                variant.QUAL = float(variant.QUAL)
+                variant.INFO = LazyInfo(_compact_info(variant.INFO), info_field_data_type, cache=False)
+            yield variant
+    # END SOLUTION
+
+
+def _parse_vcf_chunk(filename, header, ranges, bgzf, fields=None, where=None):
+    schema = VcfSchema(header)
+    parser = schema if fields is None else schema.projection(fields)
+    tracker = InfoFieldTypeTracker()
+    records = []
+    with open(filename, 'rb') as file:
+        for start, end in ranges:
+            if bgzf:
+                raw = _read_bgzf_range(file, start, end)
+            else:
+                file.seek(start)
+                raw = file.read(end - start)
+            for line in _iter_data_lines(raw.decode('utf-8').split('\n')):
+                if where is not None and not where.matches(line):
+                    continue
+                record = parser.parse_line(line)
+                if 'INFO' in record:
+                    tracker.update(record['INFO'])
+                records.append(record)
+    return records, tracker
+
+
+def _plain_vcf_chunks(filename, n_chunks):
+    with open(filename, 'rb') as file:
+        header = None
+        for line in iter(file.readline, b''):
+            line = line.strip()
+            if line and not line.startswith(b'##'):
+                header = line[1:].decode('utf-8').split('\t')
+                break
+        start = file.tell()
+        size = os.path.getsize(filename)
+        step = max(1, (size - start) // n_chunks)
+        bounds = [start]
+        pos = start + step
+        while pos < size:
+            file.seek(pos)
+            file.readline()
+            pos = file.tell()
+            if pos >= size:
+                break
+            bounds.append(pos)
+            pos += step
+        bounds.append(size)
+    return header, [[(a, b)] for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def _bgzf_vcf_chunks(filename, n_chunks):
+    index = load_region_index(filename)
+    with open(filename, 'rb') as file:
+        header = _read_vcf_header(_read_bgzf_range(file, 0, index['data_offset']).decode('utf-8').split('\n'))
+    groups = sorted((start, end) for chrom_blocks in index['blocks'].values() for _, _, start, end in chrom_blocks)
+    step = max(1, -(-len(groups) // n_chunks))
+    chunks = [groups[i:i + step] for i in range(0, len(groups), step)]
+    return header.header if header else None, chunks
+
+
+def parse_vcf_parallel(filename, workers=None, fields=None, where=None):
+    """
+    Parses a vcf in a pool of worker processes. A plain vcf is cut into byte ranges that 
+    start and end on line boundaries, and a BGZF vcf with a region index 
+    (see write_bgzf_vcf) is cut along its compressed block groups. A plain gzipped vcf 
+    cannot be split and is parsed in this process. Every chunk also collects its own 
+    InfoFieldTypeTracker, and those trackers are merged. Returns the list of variant 
+    dictionaries, in file order, together with the info field data types. 
+    workers defaults to the number of CPUs. fields and where work as in read_vcf_file.
+    """
+    # BEGIN SOLUTION
+    from concurrent.futures import ProcessPoolExecutor
+    workers = workers or os.cpu_count() or 1
+    if not _is_gzip(filename):
+        header, chunks = _plain_vcf_chunks(filename, workers * 4)
+        bgzf = False
+    elif os.path.exists(filename + '.rgi'):
+        header, chunks = _bgzf_vcf_chunks(filename, workers * 4)
+        bgzf = True
+    else:
+        header, chunks = None, []
+    if header is None or workers == 1 or len(chunks) < 2:
+        records = read_vcf_file(filename, fields=fields, where=where)
+        return records, infer_info_field_data_types(iter_info_field(records))
+    records = []
+    tracker = InfoFieldTypeTracker()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_parse_vcf_chunk, [filename] * len(chunks), [header] * len(chunks),
+                           chunks, [bgzf] * len(chunks), [fields] * len(chunks), [where] * len(chunks))
+        for chunk_records, chunk_tracker in results:
+            records.extend(chunk_records)
+            tracker.merge(chunk_tracker)
+    return records, tracker.info_field_data_type()
+    # END SOLUTION
+
+
+def read_vcf_file(filename, as_table=False, workers=1, cache_dir=None, intern=True, symbols=None, fields=None,
+                  where=None, profile=None, mmap=False):
     """
     Write a function whose input is a filename for a vcf. 
     The function reads the vcf file one variant at a time and transforms it 
     into a dictionary using the create_dict_from_line function. 
     It returns a list containing all the variant dictionaries. 
     NOTE: Your function should be able to handle multiple lines.
+
+    With as_table=True the lines are loaded straight into a columnar VariantTable instead. 
+    With workers other than 1 the file is parsed by parse_vcf_parallel (None uses every CPU). 
+    Passing cache_dir together with as_table=True serves the table from cached_vcf_table. 
+    Unless intern=False, repeated short values are interned through a SymbolTable, a new 
+    one per file or the one passed as symbols (len(symbols) is the number of unique strings). 
+    fields, e.g. ['CHROM', 'POS', 'INFO/SIFT_pred', 'FORMAT/GT'], only parses those columns 
+    (see FieldProjection). where, a VariantFilter such as 
+    VariantFilter(regions='chr4:123,000,000-124,000,000', pass_only=True), drops lines 
+    before they are parsed. profile, a PipelineProfile, records the stages of a serial read. 
+    With mmap=True an uncompressed file is read through a MappedVcf.
     """
     # BEGIN SOLUTION
-    header=None
-    x=[]
-    with open(filename, 'r') as fs:
-        for line in fs:
-            line =line.strip()
-            if not line:
-                continue
-            if line.startswith('##'):
-                continue
-            if not header:
-                header=line[1:].split('\t')
-                continue
-            
-            x.append(create_dict_from_line(header, line)) 
-        return x
-            
+    if as_table and cache_dir is not None:
+        return cached_vcf_table(filename, cache_dir)
+    if as_table:
+        return VariantTable.from_vcf(filename)
+    if workers != 1:
+        return parse_vcf_parallel(filename, workers, fields, where)[0]
+    if intern and symbols is None:
+        symbols = SymbolTable()
+    if mmap and not _is_gzip(filename):
+        with MappedVcf(filename) as vcf:
+            return list(vcf.iter_records(fields, where, symbols=symbols if intern else None))
+    return list(iter_vcf(filename, symbols=symbols if intern else None, fields=fields, where=where,
+                         profile=profile))
+    # END SOLUTION
 
-    pass
+
+def iter_info_field(data):
+    """
+    Generator version of extract_info_field. Takes any iterable of variant dictionaries 
+    (for example the output of iter_vcf) and yields their info fields one at a time.
+    """
+    # BEGIN SOLUTION
+    for info in data:
+        y = info.get('INFO')
+        if y != None:
+            yield y
     # END SOLUTION
 
 
@@ -305,14 +1507,7 @@ def extract_info_field(data):
     created in the previous part. The function should return all the info field dictionaries as list. 
     """
     # BEGIN SOLUTION
-    x = []
-    for info in data:
-        y = info.get('INFO')
-        if y != None:
-            x.append(y)
-    return x
-    pass
-   
+    return list(iter_info_field(data))
     # END SOLUTION
 
 
@@ -355,7 +1550,83 @@ def determine_data_type_of_info_fields(data):
     # END SOLUTION
 
 
-def format_data(data, info_field_data_type):
+_TYPE_RANK = {int: 0, float: 1, str: 2}
+
+
+class InfoFieldTypeTracker:
+    """
+    Incremental version of create_dictionary_of_info_field_values followed by 
+    determine_data_type_of_info_fields. The data type of each info field is updated as 
+    the info strings stream by and the values themselves are never stored. A type can 
+    only move up the lattice int -> float -> str, so trackers built over separate chunks 
+    of a file can be combined with merge.
+    """
+
+    def __init__(self):
+        self.data_types = {}
+
+    def update(self, info):
+        data_types = self.data_types
+        for item in info.split(';'):
+            k, sep, v = item.partition('=')
+            if not sep or v == '.':
+                continue
+            current = data_types.get(k)
+            if current is str:
+                continue
+            t = _classify_value(v)
+            if current is None or _TYPE_RANK[t] > _TYPE_RANK[current]:
+                data_types[k] = t
+        return self
+
+    def update_value(self, k, v):
+        current = self.data_types.get(k)
+        if current is str:
+            return
+        t = _classify_value(v)
+        if current is None or _TYPE_RANK[t] > _TYPE_RANK[current]:
+            self.data_types[k] = t
+
+    def update_all(self, data):
+        for info in data:
+            self.update(info)
+        return self
+
+    def merge(self, other):
+        data_types = self.data_types
+        for k, t in other.data_types.items():
+            current = data_types.get(k)
+            if current is None or _TYPE_RANK[t] > _TYPE_RANK[current]:
+                data_types[k] = t
+        return self
+
+    def info_field_data_type(self):
+        return dict(self.data_types)
+
+
+def infer_info_field_data_types(data, profile=None):
+    """
+    Takes an iterable of info field strings (for example the output of iter_info_field) and 
+    returns the same dictionary of info field data types as 
+    determine_data_type_of_info_fields(create_dictionary_of_info_field_values(data)), 
+    in a single pass and without keeping the distinct values in memory. profile, a 
+    PipelineProfile, records the infer_types stage.
+    """
+    # BEGIN SOLUTION
+    if profile is None:
+        return InfoFieldTypeTracker().update_all(data).info_field_data_type()
+    with profile.stage('infer_types') as stage:
+        tracker = InfoFieldTypeTracker()
+        for info in data:
+            tracker.update(info)
+            stage.records_in += 1
+        types = tracker.info_field_data_type()
+        stage.records_out = len(types)
+    return types
+    # END SOLUTION
+
+
+def format_data(data, info_field_data_type, intern=True, symbols=None, profile=None):
     """
     Write a function whose first input is the data from read_vcf_file and 
     the second input is the output from determine_data_type_of_info_fields. 
@@ -407,58 +1678,693 @@ def format_data(data, info_field_data_type):
 
     NOTE: You can only test this function in the last part! There are not tests for it    
 
+    Unless intern=False, the info field names and short str values are interned through a 
+    SymbolTable, a new one per call or the one passed as symbols. profile, a PipelineProfile, 
+    records the format stage.
     """
     # BEGIN SOLUTION
-    from collections import defaultdict
-    dict1=defaultdict(str)
+    if intern and symbols is None:
+        symbols = SymbolTable()
+    with _stage(profile, 'format') as stage:
+        formatted = list(iter_format_data(data, info_field_data_type, symbols=symbols if intern else None))
+        stage.records_in = stage.records_out = len(formatted)
+    return formatted
+    # END SOLUTION
+
+
+def _format_variant(info, info_field_data_type, cast_pos_qual=True, lazy=False, symbols=None):
     dict2=defaultdict(str)
-    dict_list=[]
+    for key in info.keys():
+        if key == 'INFO' and lazy:
+            dict2[key]=LazyInfo(info['INFO'], info_field_data_type)
+        elif key == 'INFO' and symbols is not None:
+            dict1=defaultdict(str)
+            for value in info['INFO'].split(';'):
+                k, sep, v = value.partition('=')
+                if sep and v != '.':
+                    t = info_field_data_type[k]
+                    v = t(v)
+                    dict1[symbols.intern(k)]=symbols.intern_value(v) if t is str else v
+            dict2[key]=dict1
+        elif key == 'INFO': 
+            dict1=defaultdict(str)
+            for value in info['INFO'].split(';'):
+                if len(value.split('=',1))>1 and value.split('=',1)[1] !='.':
+                    k,v= value.split('=',1)
+                    dict1[k]=info_field_data_type[k](v)
+            dict2[key]=dict1
+        elif key=='POS' and cast_pos_qual:
+            dict2[key]=int(info[key])
+        elif key=='QUAL' and cast_pos_qual:
+            dict2[key]=float(info[key])
+        else:
+            dict2[key]=info[key]
+    return dict2
+
+
+def iter_format_data(data, info_field_data_type, cast_pos_qual=True, lazy=False, symbols=None):
+    """
+    Generator version of format_data. Takes any iterable of variant dictionaries and 
+    yields them one at a time with the info field cast into the types given by 
+    info_field_data_type. Set cast_pos_qual=False to leave POS and QUAL as strings, 
+    the way format_data_gzip does. With lazy=True the info field is a LazyInfo mapping 
+    that only splits and casts the keys that are actually looked up. Pass a SymbolTable as 
+    symbols to intern the info field names and their short str values.
+    """
+    # BEGIN SOLUTION
     for info in data:
-        # dict2.clear()
-        
-        dict2=defaultdict(str)
-        for key in info.keys():
-            # dict1.clear()
-            
-            
-            if key == 'INFO': 
-                dict1=defaultdict(str)
-                for value in info['INFO'].split(';'):
-                    
-                    if len(value.split('=',1))>1 and value.split('=',1)[1] !='.':
-                        #print(value)
-                        k,v= value.split('=',1)
-                        dict1[k]=info_field_data_type[k](v)
-                dict2[key]=dict1
-                
-                # dict1.clear()
-            elif key=='POS':
-                dict2[key]=int(info[key])
-            elif key=='QUAL':
-                dict2[key]=float(info[key])
-                
+        yield _format_variant(info, info_field_data_type, cast_pos_qual, lazy, symbols)
+    # END SOLUTION
+
+
+_CATEGORICAL_FIELDS = ('CHROM', 'ID', 'REF', 'ALT', 'FILTER', 'FORMAT')
+
+
+def _categorical(values):
+    import numpy as np
+    mapping = {}
+    codes = [mapping.setdefault(v, len(mapping)) for v in values]
+    return np.array(codes, dtype=np.int32), list(mapping)
+
+
+class VariantTable:
+    """
+    Columnar table of variants backed by NumPy arrays. POS is an int64 array and QUAL a 
+    float32 array (nan for '.'). CHROM, ID, REF, ALT, FILTER and FORMAT are categorical: an 
+    int32 code array in columns plus the list of values in categories. Every info field is 
+    its own column cast with info_field_data_type (int64, float64, or categorical codes for 
+    str) with a boolean info_null mask that is True where the variant has no value. Sample 
+    columns are kept as a variants x samples matrix of codes into categories['SAMPLE'].
+
+    Lookups are boolean masks, e.g. table.filter(table.mask_equal('CHROM', '4') & (table.column('POS') > 1000)).
+    """
+
+    def __init__(self, fixed_fields, columns, categories, info, info_null, info_field_data_type,
+                 sample_names=(), samples=None):
+        self.fixed_fields = tuple(fixed_fields)
+        self.columns = columns
+        self.categories = categories
+        self.info = info
+        self.info_null = info_null
+        self.info_field_data_type = info_field_data_type
+        self.sample_names = tuple(sample_names)
+        self.samples = samples
+
+    @classmethod
+    def from_vcf(cls, filename):
+        with _open_vcf(filename) as fs:
+            schema = _read_vcf_header(fs)
+            if schema is None:
+                raise ValueError('no #CHROM header line found in %s' % filename)
+            return cls.from_lines(schema, _iter_data_lines(fs))
+
+    @classmethod
+    def from_lines(cls, schema, lines):
+        """
+        Builds a table from the data lines of a vcf whose header compiled to schema.
+        """
+        import numpy as np
+        fixed = {name: [] for name in schema.fixed_fields if name != 'INFO'}
+        fixed_index = [(schema.field_index[name], values) for name, values in fixed.items()]
+        info_index = schema.field_index.get('INFO')
+        format_index = schema.format_index
+        if format_index is not None:
+            fixed['FORMAT'] = []
+        info_rows = {}
+        info_values = {}
+        sample_rows = []
+        tracker = InfoFieldTypeTracker()
+        n = 0
+        for line in lines:
+            columns = line.split('\t')
+            for i, values in fixed_index:
+                values.append(columns[i])
+            if format_index is not None:
+                fixed['FORMAT'].append(columns[format_index])
+                sample_rows.append(columns[format_index + 1:])
+            if info_index is not None:
+                for field in columns[info_index].split(';'):
+                    k, sep, v = field.partition('=')
+                    if not sep or v == '.':
+                        continue
+                    tracker.update_value(k, v)
+                    rows = info_rows.get(k)
+                    if rows is None:
+                        rows = info_rows[k] = []
+                        info_values[k] = []
+                    if rows and rows[-1] == n:
+                        info_values[k][-1] = v
+                    else:
+                        rows.append(n)
+                        info_values[k].append(v)
+            n += 1
+
+        columns = {}
+        categories = {}
+        for name, values in fixed.items():
+            if name == 'POS':
+                columns[name] = np.array(values, dtype=np.int64)
+            elif name == 'QUAL':
+                columns[name] = np.array([np.nan if q == '.' else float(q) for q in values], dtype=np.float32)
+            else:
+                columns[name], categories[name] = _categorical(values)
+
+        info_field_data_type = tracker.info_field_data_type()
+        info = {}
+        info_null = {}
+        for k, t in info_field_data_type.items():
+            rows = np.array(info_rows[k], dtype=np.int64)
+            null = np.ones(n, dtype=bool)
+            null[rows] = False
+            if t is str:
+                codes, categories[k] = _categorical(info_values[k])
+                column = np.full(n, -1, dtype=np.int32)
+                column[rows] = codes
+            elif t is float:
+                column = np.full(n, np.nan, dtype=np.float64)
+                column[rows] = [float(v) for v in info_values[k]]
+            else:
+                column = np.zeros(n, dtype=np.int64)
+                column[rows] = [int(v) for v in info_values[k]]
+            info[k] = column
+            info_null[k] = null
+
+        samples = None
+        if schema.format_index is not None:
+            mapping = {}
+            n_samples = len(schema.sample_names)
+            samples = np.full((n, n_samples), -1, dtype=np.int32)
+            for i, row in enumerate(sample_rows):
+                samples[i, :len(row)] = [mapping.setdefault(v, len(mapping)) for v in row[:n_samples]]
+            categories['SAMPLE'] = list(mapping)
+        return cls(schema.fixed_fields, columns, categories, info, info_null, info_field_data_type,
+                   schema.sample_names, samples)
+
+    def __len__(self):
+        for column in self.columns.values():
+            return len(column)
+        for column in self.info.values():
+            return len(column)
+        return 0 if self.samples is None else len(self.samples)
+
+    def column(self, name):
+        if name in self.columns:
+            return self.columns[name]
+        return self.info[name]
+
+    def is_categorical(self, name):
+        return name in self.categories and name != 'SAMPLE'
+
+    def decode(self, name):
+        """
+        Returns the column as a NumPy object array of python values, None where missing.
+        """
+        import numpy as np
+        column = self.column(name)
+        if self.is_categorical(name):
+            lookup = np.array(list(self.categories[name]) + [None], dtype=object)
+            values = lookup[column]
+        else:
+            values = column.astype(object)
+        if name in self.info_null:
+            values[self.info_null[name]] = None
+        return values
+
+    def mask_equal(self, name, value):
+        import numpy as np
+        column = self.column(name)
+        if self.is_categorical(name):
+            try:
+                code = self.categories[name].index(value)
+            except ValueError:
+                return np.zeros(len(self), dtype=bool)
+            return column == code
+        mask = column == value
+        if name in self.info_null:
+            mask &= ~self.info_null[name]
+        return mask
+
+    def mask_present(self, name):
+        return ~self.info_null[name]
+
+    def variant_mask(self, CHROM, REF, ALT, POS):
+        return (self.mask_equal('CHROM', CHROM) & self.mask_equal('POS', POS)
+                & self.mask_equal('REF', REF) & self.mask_equal('ALT', ALT))
+
+    def find_variant(self, CHROM, REF, ALT, POS):
+        """
+        Same lookup as find_variant, as a boolean mask over the table. Returns the matching rows as a table.
+        """
+        return self.filter(self.variant_mask(CHROM, REF, ALT, POS))
+
+    def genotype_matrix(self):
+        """
+        Returns the sample columns of the table as a GenotypeMatrix.
+        """
+        return GenotypeMatrix.from_table(self)
+
+    def filter(self, mask):
+        """
+        Returns a new table with the rows selected by a boolean mask or an index array. 
+        Categories are shared with this table.
+        """
+        return VariantTable(self.fixed_fields,
+                            {k: v[mask] for k, v in self.columns.items()},
+                            self.categories,
+                            {k: v[mask] for k, v in self.info.items()},
+                            {k: v[mask] for k, v in self.info_null.items()},
+                            self.info_field_data_type,
+                            self.sample_names,
+                            None if self.samples is None else self.samples[mask])
+
+    def select(self, names):
+        """
+        Returns a new table with only the given fixed columns and info fields. Use 'INFO' to 
+        keep every info field and 'SAMPLE' to keep the sample matrix.
+        """
+        names = set(names)
+        keep_info = 'INFO' in names
+        info = {k: v for k, v in self.info.items() if keep_info or k in names}
+        fixed_fields = [k for k in self.fixed_fields if k in names or (k == 'INFO' and info)]
+        keep_samples = 'SAMPLE' in names and self.samples is not None
+        keep_columns = set(fixed_fields)
+        if keep_samples:
+            keep_columns.add('FORMAT')
+        return VariantTable(fixed_fields,
+                            {k: v for k, v in self.columns.items() if k in keep_columns},
+                            self.categories,
+                            info,
+                            {k: self.info_null[k] for k in info},
+                            {k: self.info_field_data_type[k] for k in info},
+                            self.sample_names if keep_samples else (),
+                            self.samples if keep_samples else None)
+
+    def to_records(self):
+        """
+        Yields the rows in the shape produced by format_data, so they can be passed to 
+        save_data_as_json or pull_basic_and_predictor_fields.
+        """
+        fixed = {}
+        for name in self.columns:
+            if name == 'QUAL':
+                fixed[name] = [float(q) for q in self.columns[name].astype(str)]
             else:
-                dict2[key]=info[key]
-        dict_list.append(dict2)
-        # dict2.clear()
-    return dict_list
-                
-        
-                
-        
-        
+                fixed[name] = self.decode(name).tolist()
+        info = [(k, self.decode(k).tolist()) for k in self.info]
+        sample_categories = self.categories.get('SAMPLE')
+        format_keys = {}
+        for i in range(len(self)):
+            record = defaultdict(str)
+            for name in self.fixed_fields:
+                if name == 'INFO':
+                    record[name] = {k: values[i] for k, values in info if values[i] is not None}
+                elif name in fixed:
+                    record[name] = fixed[name][i]
+            if self.samples is not None:
+                format_field = fixed['FORMAT'][i]
+                keys = format_keys.get(format_field)
+                if keys is None:
+                    keys = format_keys[format_field] = format_field.split(':')
+                record['SAMPLE'] = {name: dict(zip(keys, sample_categories[code].split(':')))
+                                    for name, code in zip(self.sample_names, self.samples[i].tolist())
+                                    if code >= 0}
+            yield record
+
+    def save(self, directory):
+        """
+        Writes the table to directory as .npy arrays plus a meta.json file, so that 
+        VariantTable.load can memory-map it back. Categories are stored as one UTF-8 blob 
+        with an offsets array instead of as Python strings.
+        """
+        import numpy as np
+        os.makedirs(directory, exist_ok=True)
+        info_keys = list(self.info)
+        category_names = list(self.categories)
+        for name, column in self.columns.items():
+            np.save(os.path.join(directory, 'column.%s.npy' % name), column)
+        for i, k in enumerate(info_keys):
+            np.save(os.path.join(directory, 'info.%d.npy' % i), self.info[k])
+            np.save(os.path.join(directory, 'null.%d.npy' % i), self.info_null[k])
+        for i, name in enumerate(category_names):
+            encoded = [v.encode('utf-8') for v in self.categories[name]]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(v) for v in encoded], out=offsets[1:])
+            np.save(os.path.join(directory, 'categories.%d.blob.npy' % i), np.frombuffer(b''.join(encoded), dtype=np.uint8))
+            np.save(os.path.join(directory, 'categories.%d.offsets.npy' % i), offsets)
+        if self.samples is not None:
+            np.save(os.path.join(directory, 'samples.npy'), self.samples)
+        meta = {'fixed_fields': list(self.fixed_fields), 'columns': list(self.columns), 'info': info_keys,
+                'info_field_data_type': {k: t.__name__ for k, t in self.info_field_data_type.items()},
+                'categories': category_names, 'sample_names': list(self.sample_names),
+                'samples': self.samples is not None}
+        with open(os.path.join(directory, 'meta.json'), 'w') as file:
+            json.dump(meta, file)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        import numpy as np
+        mmap_mode = 'r' if mmap else None
+
+        def load_array(name):
+            return np.load(os.path.join(directory, name), mmap_mode=mmap_mode)
+
+        with open(os.path.join(directory, 'meta.json'), 'r') as file:
+            meta = json.load(file)
+        types = {'int': int, 'float': float, 'str': str}
+        columns = {name: load_array('column.%s.npy' % name) for name in meta['columns']}
+        info = {k: load_array('info.%d.npy' % i) for i, k in enumerate(meta['info'])}
+        info_null = {k: load_array('null.%d.npy' % i) for i, k in enumerate(meta['info'])}
+        categories = {name: _StringColumn(load_array('categories.%d.blob.npy' % i),
+                                          load_array('categories.%d.offsets.npy' % i))
+                      for i, name in enumerate(meta['categories'])}
+        samples = load_array('samples.npy') if meta['samples'] else None
+        return cls(meta['fixed_fields'], columns, categories, info, info_null,
+                   {k: types[t] for k, t in meta['info_field_data_type'].items()},
+                   meta['sample_names'], samples)
+
+
+
+class _StringColumn(Sequence):
+    """
+    Read-only list of strings stored as a UTF-8 blob plus an offsets array, as written by 
+    VariantTable.save. Strings are decoded when they are indexed.
+    """
 
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+        self._index = None
 
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
 
-            
-    
+    def __len__(self):
+        return len(self.offsets) - 1
 
+    def index(self, value, start=0, stop=None):
+        if self._index is None:
+            self._index = {}
+            for i, v in enumerate(self):
+                self._index.setdefault(v, i)
+        i = self._index.get(value)
+        if i is None or i < start or (stop is not None and i >= stop):
+            raise ValueError('%r is not in list' % (value,))
+        return i
 
-    pass
+
+def _genotype_code(gt):
+    if not gt or '.' in gt:
+        return -1, False, 0
+    alleles = gt.replace('|', '/').split('/')
+    return min(sum(a != '0' for a in alleles), 127), '|' in gt, len(alleles)
+
+
+def _format_int(value):
+    try:
+        return int(value)
+    except ValueError:
+        return -1
+
+
+class GenotypeMatrix:
+    """
+    Dense NumPy arrays of the sample columns of a vcf, one row per variant and one column 
+    per sample:
+
+        GT       int8, number of non-reference alleles in the call (0/0 is 0, 0|1 is 1, 
+                 1/1 is 2), -1 where the call is missing ('./.', '.', '0/.' or no GT)
+        phased   bool, True where the call is phased ('0|1')
+        ploidy   int8, number of alleles in the call, 0 where it is missing
+        DP, GQ   int32, -1 where missing
+        AD       int32, variants x samples x alleles (REF first), -1 where missing or past 
+                 the alleles of the variant
+
+    Every distinct sample string is split only once, whatever the number of cells holding 
+    it, and the arrays are filled from those results by fancy indexing.
+    """
+
+    def __init__(self, sample_names, GT, phased, ploidy, DP, GQ, AD):
+        self.sample_names = tuple(sample_names)
+        self.GT = GT
+        self.phased = phased
+        self.ploidy = ploidy
+        self.DP = DP
+        self.GQ = GQ
+        self.AD = AD
+
+    @classmethod
+    def from_vcf(cls, filename, where=None):
+        """
+        Builds the matrix straight from a vcf (plain or gzipped) without parsing the fixed 
+        or info columns. Only the lines accepted by where, a VariantFilter, are kept.
+        """
+        import numpy as np
+        with _open_vcf(filename) as fs:
+            schema = _read_vcf_header(fs)
+            if schema is None:
+                raise ValueError('no #CHROM header line found in %s' % filename)
+            if schema.format_index is None:
+                raise ValueError('%s has no sample columns' % filename)
+            first = schema.format_index
+            n_samples = len(schema.sample_names)
+            formats = {}
+            cells = {}
+            format_codes = []
+            sample_codes = []
+            for line in _iter_data_lines(fs):
+                if where is not None and not where.matches(line):
+                    continue
+                columns = line.split('\t')
+                format_codes.append(formats.setdefault(columns[first], len(formats)))
+                row = [cells.setdefault(v, len(cells)) for v in columns[first + 1:first + 1 + n_samples]]
+                row.extend([-1] * (n_samples - len(row)))
+                sample_codes.append(row)
+        return cls.from_codes(schema.sample_names, list(formats), np.array(format_codes, dtype=np.int32),
+                              list(cells), np.array(sample_codes, dtype=np.int32).reshape(-1, n_samples))
+
+    @classmethod
+    def from_table(cls, table):
+        if table.samples is None:
+            raise ValueError('the table has no sample columns')
+        return cls.from_codes(table.sample_names, table.categories['FORMAT'], table.columns['FORMAT'],
+                              table.categories['SAMPLE'], table.samples)
+
+    @classmethod
+    def from_codes(cls, sample_names, formats, format_codes, cells, sample_codes):
+        """
+        Builds the matrix from a FORMAT code per variant and a variants x samples matrix of 
+        codes into cells (-1 for a missing sample), the way VariantTable stores them.
+        """
+        import numpy as np
+        n, m = sample_codes.shape
+        GT = np.full((n, m), -1, dtype=np.int8)
+        phased = np.zeros((n, m), dtype=bool)
+        ploidy = np.zeros((n, m), dtype=np.int8)
+        DP = np.full((n, m), -1, dtype=np.int32)
+        GQ = np.full((n, m), -1, dtype=np.int32)
+        ad_blocks = []
+        width = 0
+        for f, format_field in enumerate(formats):
+            rows = np.flatnonzero(format_codes == f)
+            if not len(rows):
+                continue
+            index = {k: i for i, k in enumerate(format_field.split(':'))}
+            codes, inverse = np.unique(sample_codes[rows], return_inverse=True)
+            inverse = inverse.reshape(len(rows), m)
+            values = [cells[c].split(':') if c >= 0 else [] for c in codes.tolist()]
+            if 'GT' in index:
+                i = index['GT']
+                calls = [_genotype_code(v[i] if i < len(v) else '') for v in values]
+                GT[rows] = np.array([c[0] for c in calls], dtype=np.int8)[inverse]
+                phased[rows] = np.array([c[1] for c in calls], dtype=bool)[inverse]
+                ploidy[rows] = np.array([c[2] for c in calls], dtype=np.int8)[inverse]
+            for key, array in (('DP', DP), ('GQ', GQ)):
+                if key in index:
+                    i = index[key]
+                    lookup = [_format_int(v[i]) if i < len(v) else -1 for v in values]
+                    array[rows] = np.array(lookup, dtype=np.int32)[inverse]
+            if 'AD' in index:
+                i = index['AD']
+                depths = [[_format_int(d) for d in v[i].split(',')] if i < len(v) and v[i] != '.' else []
+                          for v in values]
+                width = max(width, max(map(len, depths)))
+                ad_blocks.append((rows, inverse, depths))
+        AD = np.full((n, m, width), -1, dtype=np.int32)
+        for rows, inverse, depths in ad_blocks:
+            lookup = np.full((len(depths), width), -1, dtype=np.int32)
+            for j, d in enumerate(depths):
+                lookup[j, :len(d)] = d
+            AD[rows] = lookup[inverse]
+        return cls(sample_names, GT, phased, ploidy, DP, GQ, AD)
+
+    def __len__(self):
+        return len(self.GT)
+
+    def called(self):
+        """
+        Boolean mask of the calls that are not missing.
+        """
+        return self.GT >= 0
+
+    def call_rate(self, axis=1):
+        """
+        Fraction of called genotypes per variant (axis=1) or per sample (axis=0).
+        """
+        import numpy as np
+        called = self.called()
+        if called.shape[axis] == 0:
+            return np.full(called.shape[1 - axis], np.nan)
+        return called.mean(axis=axis)
+
+    def allele_frequency(self):
+        """
+        Non-reference allele frequency per variant over the called genotypes: the number of 
+        non-reference alleles divided by the number of called alleles, nan where no sample 
+        is called.
+        """
+        import numpy as np
+        called = self.called()
+        alternate = np.where(called, self.GT, 0).sum(axis=1, dtype=np.int64)
+        total = np.where(called, self.ploidy, 0).sum(axis=1, dtype=np.int64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(total > 0, alternate / total, np.nan)
+
+    def depth_summary(self):
+        """
+        Per-sample DP summary over the variants where DP is present. Returns a dictionary of 
+        arrays (one value per sample) with the keys count, mean, median, min and max; the 
+        statistics are nan for a sample without any DP.
+        """
+        import numpy as np
+        import warnings
+        depth = np.where(self.DP >= 0, self.DP, np.nan)
+        if not len(depth):
+            empty = np.full(depth.shape[1], np.nan)
+            return {'count': np.zeros(depth.shape[1], dtype=np.int64), 'mean': empty,
+                    'median': empty, 'min': empty, 'max': empty}
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return {'count': (self.DP >= 0).sum(axis=0),
+                    'mean': np.nanmean(depth, axis=0),
+                    'median': np.nanmedian(depth, axis=0),
+                    'min': np.nanmin(depth, axis=0),
+                    'max': np.nanmax(depth, axis=0)}
+
+
+DEFAULT_VCF_CACHE_DIR = os.environ.get('VCF_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'mini_project1'))
+DEFAULT_VCF_CACHE_BYTES = 10 * 1024 ** 3
+
+
+def _file_sha256(filename):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _directory_size(directory):
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+
+def _evict_vcf_cache(cache_dir, max_bytes, keep=None):
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_dir() and os.path.exists(os.path.join(entry.path, 'source.json')):
+            last_used = os.stat(os.path.join(entry.path, 'source.json')).st_mtime
+            entries.append((last_used, entry.path, _directory_size(entry.path)))
+    total = sum(size for _, _, size in entries)
+    for _, path, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path != keep:
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+def cached_vcf_table(filename, cache_dir=None, max_cache_bytes=DEFAULT_VCF_CACHE_BYTES, check_hash=False):
+    """
+    Returns the VariantTable of a vcf from a binary snapshot in cache_dir 
+    (DEFAULT_VCF_CACHE_DIR, or $VCF_CACHE_DIR, by default). The snapshot holds the typed 
+    columns, the inferred info_field_data_type and the sample matrix, and is memory-mapped 
+    when the size and modification time of the vcf match the ones recorded with it. With 
+    check_hash=True a vcf whose size or mtime changed is still served from the snapshot 
+    when its SHA-256 is unchanged. Otherwise the vcf is parsed once more and the snapshot 
+    replaced. After a new snapshot is written, the least recently used ones are removed 
+    until the cache is under max_cache_bytes.
+    """
+    # BEGIN SOLUTION
+    cache_dir = cache_dir or DEFAULT_VCF_CACHE_DIR
+    path = os.path.abspath(filename)
+    entry = os.path.join(cache_dir, hashlib.sha1(path.encode('utf-8')).hexdigest()[:16])
+    source_file = os.path.join(entry, 'source.json')
+    stat = os.stat(path)
+    try:
+        with open(source_file, 'r') as file:
+            source = json.load(file)
+    except (OSError, ValueError):
+        source = None
+    if source and source['path'] == path:
+        fresh = (source['size'], source['mtime_ns']) == (stat.st_size, stat.st_mtime_ns)
+        if not fresh and check_hash and source.get('sha256') == _file_sha256(path):
+            source.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            with open(source_file, 'w') as file:
+                json.dump(source, file)
+            fresh = True
+        if fresh:
+            os.utime(source_file)
+            return VariantTable.load(entry)
+
+    table = VariantTable.from_vcf(filename)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = '%s.%d.tmp' % (entry, os.getpid())
+    shutil.rmtree(tmp, ignore_errors=True)
+    table.save(tmp)
+    source = {'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+              'sha256': _file_sha256(path) if check_hash else None, 'created': time.time()}
+    with open(os.path.join(tmp, 'source.json'), 'w') as file:
+        json.dump(source, file)
+    shutil.rmtree(entry, ignore_errors=True)
+    os.replace(tmp, entry)
+    if max_cache_bytes is not None:
+        _evict_vcf_cache(cache_dir, max_cache_bytes, keep=entry)
+    return VariantTable.load(entry)
     # END SOLUTION
 
 
-def save_data_as_json(data, filename):
+def cached_format_data(filename, cache_dir=None, max_cache_bytes=DEFAULT_VCF_CACHE_BYTES, check_hash=False):
+    """
+    Cached equivalent of format_data(read_vcf_file(filename), info_field_data_type). 
+    Returns the formatted variants and the info_field_data_type, both taken from the 
+    snapshot kept by cached_vcf_table.
+    """
+    # BEGIN SOLUTION
+    table = cached_vcf_table(filename, cache_dir, max_cache_bytes, check_hash)
+    return list(table.to_records()), dict(table.info_field_data_type)
+    # END SOLUTION
+
+
+def _is_jsonl(filename):
+    # JSON Lines when the first non-blank line is a complete object on its own, whatever the 
+    # extension; an array or an indented document spans several lines. A file holding a 
+    # single one-line object is a whole document unless the name ends in .jsonl or .ndjson
+    with open(filename, 'rb') as file:
+        lines = (line for line in file if line.strip())
+        first = next(lines, b'').strip()
+        if first[:1] != b'{':
+            return False
+        try:
+            json.loads(first)
+        except ValueError:
+            return False
+        return next(lines, None) is not None or filename.endswith(('.jsonl', '.ndjson'))
+
+
+def save_data_as_json(data, filename, jsonl=None, profile=None):
     """
     Write a function whose inputs are a Python dictionary and filename. 
     The function will saves the dictionary as a json file using the filename given. 
@@ -466,13 +2372,30 @@ def save_data_as_json(data, filename):
     Use these options to correctly format your JSON -- 
     sort_keys=True, indent=4, separators=(',', ': '), ensure_ascii=False. 
     Use this function to save your parsed data as a json file.
+
+    With jsonl=True (the default for filenames ending in .jsonl or .ndjson) data can be any 
+    iterable of records, and every record is written as one compact line as soon as it is 
+    produced, so the whole output never has to be held in memory. The readers tell the two 
+    formats apart by their content, so jsonl=True also works with a .json filename. profile, a 
+    PipelineProfile, records the serialize stage (with a jsonl generator, its time includes 
+    producing the records).
     """
     # BEGIN SOLUTION
-    
-    with open(filename, 'w') as file:
-        json.dump(data, file, sort_keys=True, indent=2, separators=(',', ': '), ensure_ascii=False)
-
-    pass
+    if jsonl is None:
+        jsonl = filename.endswith(('.jsonl', '.ndjson'))
+    with _stage(profile, 'serialize') as stage, open(filename, 'w') as file:
+        if jsonl:
+            for record in data:
+                file.write(json.dumps(record, sort_keys=True, separators=(',', ':'), ensure_ascii=False,
+                                      default=_json_default))
+                file.write('\n')
+                stage.records_in += 1
+        else:
+            json.dump(data, file, sort_keys=True, indent=2, separators=(',', ': '), ensure_ascii=False, default=_json_default)
+            if profile is not None and isinstance(data, Sized):
+                stage.records_in = len(data)
+        stage.records_out = stage.records_in
+        stage.bytes = file.tell()
     # END SOLUTION
 
 
@@ -483,13 +2406,202 @@ def load_data_from_json(filename):
     which you saved your final parsed data. 
     """
     # BEGIN SOLUTION
-    import json
+    if _is_jsonl(filename):
+        return list(iter_data_from_json(filename))
     with open(filename, 'r') as file:
         data_reloaded = json.load(file)
     return data_reloaded
+    # END SOLUTION
 
 
-    pass
+def _iter_json_array(file, chunk_size=1 << 20):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    i = 0
+    eof = False
+    started = False
+    while True:
+        while i < len(buffer) and buffer[i].isspace():
+            i += 1
+        more = i == len(buffer)
+        if not more and not started:
+            if buffer[i] != '[':
+                raise ValueError('expected a JSON array')
+            started = True
+            i += 1
+            continue
+        if not more and buffer[i] == ']':
+            return
+        if not more and buffer[i] == ',':
+            i += 1
+            continue
+        if not more:
+            try:
+                ele, end = decoder.raw_decode(buffer, i)
+                more = not eof and (end == len(buffer) or buffer[end] not in ' \t\r\n,]')
+            except ValueError:
+                if eof:
+                    raise
+                more = True
+        if more:
+            if eof:
+                if started:
+                    raise ValueError('unterminated JSON array')
+                return
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[i:] + chunk
+            i = 0
+            continue
+        yield ele
+        i = end
+
+
+def iter_data_from_json(filename):
+    """
+    Generator version of load_data_from_json. Yields the records of a JSON Lines file one 
+    line at a time, or the elements of a JSON array file (as written by save_data_as_json) 
+    while reading it in chunks, so neither format has to fit in memory.
+    """
+    # BEGIN SOLUTION
+    with open(filename, 'r') as file:
+        if _is_jsonl(filename):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _iter_json_array(file)
+    # END SOLUTION
+
+
+def _variant_key(CHROM, POS, REF, ALT):
+    return json.dumps([CHROM, POS, REF, ALT])
+
+
+def _utf8_length(text):
+    return len(text) if text.isascii() else len(text.encode('utf-8'))
+
+
+def _iter_json_array_offsets(filename, chunk_size=1 << 20):
+    # Same scan as _iter_json_array, also yielding the byte offset and length of every 
+    # element. (char, byte) is a cursor into buffer and base the byte offset of buffer[0].
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    base = char = byte = 0
+    i = 0
+    eof = False
+    started = False
+    with open(filename, 'rb') as file:
+        while True:
+            while i < len(buffer) and buffer[i].isspace():
+                i += 1
+            more = i == len(buffer)
+            if not more and not started:
+                if buffer[i] != '[':
+                    raise ValueError('%s does not contain a JSON array' % filename)
+                started = True
+                i += 1
+                continue
+            if not more and buffer[i] == ']':
+                return
+            if not more and buffer[i] == ',':
+                i += 1
+                continue
+            if not more:
+                try:
+                    ele, end = decoder.raw_decode(buffer, i)
+                    more = not eof and (end == len(buffer) or buffer[end] not in ' \t\r\n,]')
+                except ValueError:
+                    if eof:
+                        raise
+                    more = True
+            if more:
+                if eof:
+                    if started:
+                        raise ValueError('unterminated JSON array in %s' % filename)
+                    raise ValueError('%s does not contain a JSON array' % filename)
+                chunk = file.read(chunk_size)
+                eof = not chunk
+                base += byte + _utf8_length(buffer[char:i])
+                buffer = buffer[i:] + utf8.decode(chunk, final=eof)
+                i = char = byte = 0
+                continue
+            byte += _utf8_length(buffer[char:i])
+            length = _utf8_length(buffer[i:end])
+            yield ele, base + byte, length
+            byte += length
+            char = i = end
+
+
+def _iter_jsonl_offsets(filename):
+    with open(filename, 'rb') as file:
+        offset = 0
+        for line in file:
+            record = line.strip()
+            if record:
+                yield json.loads(record.decode('utf-8')), offset + line.index(record[:1]), len(record)
+            offset += len(line)
+
+
+def build_variant_index(filename):
+    """
+    Scans a JSON or JSON Lines file written by save_data_as_json once and writes a sidecar index next to 
+    it (filename + '.idx') that maps (CHROM, POS, REF, ALT) to the byte offset and length 
+    of every matching record. The index also stores the size and modification time of the 
+    JSON file so load_variant_index can tell when it is out of date. When the sidecar cannot 
+    be written the index is only kept in memory. The file is read in chunks, so a large 
+    JSON array is never held in memory whole. Returns the mapping.
+    """
+    # BEGIN SOLUTION
+    entries = defaultdict(list)
+    offsets = _iter_jsonl_offsets(filename) if _is_jsonl(filename) else _iter_json_array_offsets(filename)
+    for ele, offset, length in offsets:
+        if isinstance(ele, dict):
+            key = _variant_key(ele.get('CHROM'), ele.get('POS'), ele.get('REF'), ele.get('ALT'))
+            entries[key].append((offset, length))
+    stat = os.stat(filename)
+    index_filename = filename + '.idx'
+    try:
+        with open(index_filename + '.tmp', 'w') as file:
+            json.dump({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'entries': entries}, file)
+        os.replace(index_filename + '.tmp', index_filename)
+    except OSError:
+        # read-only directory: the index is only kept in memory
+        try:
+            os.remove(index_filename + '.tmp')
+        except OSError:
+            pass
+    _variant_index_cache[filename] = (stat.st_size, stat.st_mtime_ns, entries)
+    return entries
+    # END SOLUTION
+
+
+_variant_index_cache = {}
+
+
+def load_variant_index(filename):
+    """
+    Returns the (CHROM, POS, REF, ALT) index of a JSON file, reading it from the sidecar 
+    file and keeping it in memory for later calls. The index is rebuilt with 
+    build_variant_index when it is missing or when the size or modification time of the 
+    JSON file has changed since it was built.
+    """
+    # BEGIN SOLUTION
+    stat = os.stat(filename)
+    cached = _variant_index_cache.get(filename)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+    try:
+        with open(filename + '.idx', 'r') as file:
+            index = json.load(file)
+    except (OSError, ValueError):
+        index = None
+    if not index or (index.get('size'), index.get('mtime_ns')) != (stat.st_size, stat.st_mtime_ns):
+        return build_variant_index(filename)
+    entries = index['entries']
+    _variant_index_cache[filename] = (stat.st_size, stat.st_mtime_ns, entries)
+    return entries
     # END SOLUTION
 
 
@@ -498,129 +2610,872 @@ def find_variant(CHROM, REF, ALT, POS, filename):
     Write a function whose inputs are CHROM, REF, ALT, POS, and filename. 
     Using these inputs, the function should load a JSON file using the given 
     filename and return a list of variants that match the given CHROM, REF, ALT, and POS. 
+
+    The lookup goes through the sidecar index from load_variant_index, so only the 
+    matching records are read and parsed. filename can also be a database written by 
+    save_data_as_db, which is queried through its (CHROM, POS) index.
     """
     # BEGIN SOLUTION
-    data=load_data_from_json(filename)
+    if _is_sqlite(filename):
+        return find_variant_in_db(CHROM, REF, ALT, POS, filename)
+    index = load_variant_index(filename)
     list1=[]
-    for ele in data:
-        if ele['CHROM']==CHROM and ele['REF']==REF and ele['ALT']==ALT and ele['POS']==POS:
-            list1.append(ele)
+    with open(filename, 'rb') as file:
+        for offset, length in index.get(_variant_key(CHROM, POS, REF, ALT), ()):
+            file.seek(offset)
+            list1.append(json.loads(file.read(length).decode('utf-8')))
     return list1
-    pass
+    # END SOLUTION
+
+
+def _predictor_fields(v, weights=None):
+    weights = weights or PREDICTOR_WEIGHTS
+    dict1=defaultdict(int)
+    dict1.update({'CHROM': v['CHROM'], 'POS': v['POS'], 'REF': v['REF'], 'ALT': v['ALT'],'sum_predictor_values':0})
+    for pred, pred_weights in weights.items():
+        if pred in v['INFO'].keys():
+            dict1[pred]=v['INFO'][pred]
+            weight = pred_weights.get(dict1[pred])
+            if weight:
+                dict1['sum_predictor_values']+=weight
+    return dict1
+
+
+def iter_predictor_fields(data, weights=None, threshold=None):
+    """
+    Takes any iterable of formatted variants (the output of format_data or iter_format_data) 
+    and yields the basic and predictor fields, with sum_predictor_values, for every variant 
+    that has at least one predictor. weights maps every predictor to the weight of each of 
+    its values and defaults to PREDICTOR_WEIGHTS. When threshold is given only variants whose 
+    sum_predictor_values is greater than threshold are yielded.
+    """
+    # BEGIN SOLUTION
+    weights = weights or PREDICTOR_WEIGHTS
+    for v in data:
+        if v['INFO'].keys() & weights.keys():
+            dict1 = _predictor_fields(v, weights)
+            if threshold is None or dict1['sum_predictor_values'] > threshold:
+                yield dict1
+    # END SOLUTION
+
+
+def score_predictors(table, weights=None):
+    """
+    Vectorized sum_predictor_values for a whole VariantTable. Every predictor column is 
+    categorical, so its weights are looked up once per category and then gathered for all 
+    variants with one indexing operation. Returns three arrays: the scores, a mask of the 
+    variants that have at least one predictor, and a mask of the scores that received a 
+    fractional weight (the ones that the row-wise code would produce as floats).
+    """
+    # BEGIN SOLUTION
+    import numpy as np
+    weights = weights or PREDICTOR_WEIGHTS
+    n = len(table)
+    scores = np.zeros(n, dtype=np.float64)
+    has_predictor = np.zeros(n, dtype=bool)
+    fractional = np.zeros(n, dtype=bool)
+    for pred, pred_weights in weights.items():
+        if pred not in table.info:
+            continue
+        has_predictor |= ~table.info_null[pred]
+        if not table.is_categorical(pred):
+            continue
+        categories = list(table.categories[pred])
+        lookup = np.array([pred_weights.get(c, 0) for c in categories] + [0], dtype=np.float64)
+        is_fraction = np.array([isinstance(pred_weights.get(c, 0), float) and bool(pred_weights.get(c))
+                                for c in categories] + [False])
+        codes = table.info[pred]
+        scores += lookup[codes]
+        fractional |= is_fraction[codes]
+    return scores, has_predictor, fractional
+    # END SOLUTION
+
+
+def iter_table_predictor_fields(table, weights=None, threshold=None):
+    """
+    Same output as iter_predictor_fields, computed from a VariantTable with score_predictors. 
+    The threshold filter is applied to the score array before any record is built.
+    """
+    # BEGIN SOLUTION
+    import numpy as np
+    weights = weights or PREDICTOR_WEIGHTS
+    scores, mask, fractional = score_predictors(table, weights)
+    if threshold is not None:
+        mask &= scores > threshold
+    rows = np.flatnonzero(mask)
+    selected = table.filter(rows)
+    preds = [pred for pred in weights if pred in selected.info]
+    pred_values = {pred: selected.decode(pred).tolist() for pred in preds}
+    basic = {name: selected.decode(name).tolist() for name in ('CHROM', 'POS', 'REF', 'ALT')}
+    for i, (score, is_fraction) in enumerate(zip(scores[rows].tolist(), fractional[rows].tolist())):
+        dict1 = defaultdict(int)
+        dict1.update({name: values[i] for name, values in basic.items()})
+        dict1['sum_predictor_values'] = score if is_fraction else int(score)
+        for pred in preds:
+            if pred_values[pred][i] is not None:
+                dict1[pred] = pred_values[pred][i]
+        yield dict1
+    # END SOLUTION
+
+
+def iter_vcf_predictor_fields(filename):
+    """
+    Chains the streaming functions into a pipeline that goes from a vcf (or .vcf.gz) file 
+    to predictor records. The file is read twice: once to determine the info field data 
+    types and once to format and score the variants, so memory does not grow with the file.
+    """
+    # BEGIN SOLUTION
+    info_field_data_type = infer_info_field_data_types(iter_info_field(iter_vcf(filename)))
+    return iter_predictor_fields(iter_format_data(iter_vcf(filename, lazy=True), info_field_data_type, lazy=True))
     # END SOLUTION
 
 
 def pull_basic_and_predictor_fields(filename):
     """
     Load mini_project1_data.json and pull out all the variants that have a 
+
+    filename can also be a database written by save_data_as_db, in which case only its 
+    info table is scanned.
     """
     # BEGIN SOLUTION
-    predictors= { 'FATHMM_pred', 'LRT_pred', 'MetaLR_pred', 'MetaSVM_pred',
-                      'MutationAssessor_pred', 'MutationTaster_pred', 'PROVEAN_pred', 'Polyphen2_HDIV_pred',
-                      'Polyphen2_HVAR_pred', 'SIFT_pred'}
-    data=load_data_from_json(filename)
+    if _is_sqlite(filename):
+        data = iter_predictor_fields_from_db(filename)
+    else:
+        data = iter_predictor_fields(iter_data_from_json(filename))
     
     variants = []
+    for dict1 in data:
+        variants.append(dict1)
+        print(dict1)
+    return variants
+
+    # END SOLUTION
+
+
+### SQLite variant store
+
+def create_connection(db_file, delete_db=False):
+    if delete_db and os.path.exists(db_file):
+        os.remove(db_file)
+
+    conn = None
+    try:
+        conn = sqlite3.connect(db_file)
+        conn.execute("PRAGMA foreign_keys = 1")
+    except Error as e:
+        print(e)
+
+    return conn
+
+
+def create_table(conn, create_table_sql, drop_table_name=None):
+    
+    if drop_table_name: # You can optionally pass drop_table_name to drop the table. 
+        try:
+            c = conn.cursor()
+            c.execute("""DROP TABLE IF EXISTS %s""" % (drop_table_name))
+        except Error as e:
+            print(e)
+    
+    try:
+        c = conn.cursor()
+        c.execute(create_table_sql)
+    except Error as e:
+        print(e)
+
+
+_SQLITE_MAGIC = b'SQLite format 3\x00'
+
+
+def _is_sqlite(filename):
+    try:
+        with open(filename, 'rb') as file:
+            return file.read(16) == _SQLITE_MAGIC
+    except OSError:
+        return False
+
+
+_CREATE_VARIANTS_SQL = """
+    CREATE TABLE Variants (
+        VariantID INTEGER NOT NULL PRIMARY KEY,
+        CHROM TEXT NOT NULL,
+        POS NOT NULL,
+        ID TEXT,
+        REF TEXT,
+        ALT TEXT,
+        QUAL,
+        FILTER TEXT,
+        INFO TEXT
+    );
+"""
+
+_CREATE_INFO_SQL = """
+    CREATE TABLE Info (
+        VariantID INTEGER NOT NULL,
+        Key TEXT NOT NULL,
+        Value,
+        FOREIGN KEY (VariantID) REFERENCES Variants (VariantID)
+    );
+"""
+
+_CREATE_SAMPLES_SQL = """
+    CREATE TABLE Samples (
+        VariantID INTEGER NOT NULL,
+        Sample TEXT NOT NULL,
+        GT TEXT,
+        Data TEXT,
+        FOREIGN KEY (VariantID) REFERENCES Variants (VariantID)
+    );
+"""
+
+
+def save_data_as_db(data, db_file, info_keys=None, batch_size=10000):
+    """
+    Bulk loads formatted variants (the output of format_data or any iterable of such 
+    records) into a new SQLite database:
+
+        Variants   one row per variant, indexed on (CHROM, POS); INFO is the info field as JSON
+        Info       long table (VariantID, Key, Value) of the info_keys of every variant, 
+                   PREDICTOR_FIELDS by default, indexed on Key
+        Samples    one row per variant and sample with its GT and every FORMAT value as JSON
+
+    Rows are inserted with executemany in one transaction per batch_size variants, and 
+    the indexes are built after the load. POS, QUAL and the Info values are stored with the 
+    type they have in the records, so string POS and QUAL (as format_data_gzip leaves them) 
+    stay strings. An existing db_file is replaced. Returns the number of variants loaded.
+    """
+    # BEGIN SOLUTION
+    info_keys = PREDICTOR_FIELDS if info_keys is None else set(info_keys)
+    conn = create_connection(db_file, delete_db=True)
+    create_table(conn, _CREATE_VARIANTS_SQL)
+    create_table(conn, _CREATE_INFO_SQL)
+    create_table(conn, _CREATE_SAMPLES_SQL)
+    n = 0
+    variants, info, samples = [], [], []
+
+    def flush():
+        with conn:
+            conn.executemany('INSERT INTO Variants VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', variants)
+            conn.executemany('INSERT INTO Info VALUES (?, ?, ?)', info)
+            conn.executemany('INSERT INTO Samples VALUES (?, ?, ?, ?)', samples)
+        del variants[:], info[:], samples[:]
+
     for v in data:
-        if v['INFO'].keys() & predictors:
-            dict1=defaultdict(int)
-            dict1.update({'CHROM': v['CHROM'], 'POS': v['POS'], 'REF': v['REF'], 'ALT': v['ALT'],'sum_predictor_values':0})
-                         
-                         
-                    #      'FATHMM_pred': v['INFO']['FATHMM_pred'], 'LRT_pred': v['INFO']['LRT_pred'], 
-                    # 'MetaLR_pred': v['INFO']['MetaLR_pred'], 'MetaSVM_pred': v['INFO']['MetaSVM_pred'], 
-                    # 'MutationAssessor_pred': v['INFO']['MutationAssessor_pred'], 'MutationTaster_pred': v['INFO']['MutationTaster_pred'], 
-                    # 'PROVEAN_pred': v['INFO']['PROVEAN_pred'], 'Polyphen2_HDIV_pred': v['INFO']['Polyphen2_HDIV_pred'], 
-                    # 'Polyphen2_HVAR_pred': v['INFO']['Polyphen2_HVAR_pred'], 'SIFT_pred': v['INFO']['SIFT_pred'],'sum_predictor_values':0})
-                            
-            for pred in predictors:
-                if pred in v['INFO'].keys():
-                    dict1[pred]=v['INFO'][pred]
-                    if v['INFO'][pred]in('A','H','D'):
-                        dict1['sum_predictor_values']+=1
-                    elif v['INFO'][pred]in ('M','P') and pred != 'MutationTaster_pred':
-                        dict1['sum_predictor_values']+=0.5
-                    elif v['INFO'][pred]in ('L'):
-                        dict1['sum_predictor_values']+=0.25
-                            
-            variants.append(dict1)
-            print(dict1)
+        n += 1
+        v_info = v['INFO']
+        variants.append((n, v['CHROM'], v['POS'], v['ID'], v['REF'], v['ALT'], v['QUAL'], v['FILTER'],
+                         json.dumps(v_info, separators=(',', ':'), ensure_ascii=False, default=_json_default)))
+        for k in info_keys & v_info.keys():
+            info.append((n, k, v_info[k]))
+        for name, fields in v['SAMPLE'].items():
+            samples.append((n, name, fields.get('GT'),
+                            json.dumps(fields, separators=(',', ':'), ensure_ascii=False, default=_json_default)))
+        if len(variants) >= batch_size:
+            flush()
+    flush()
+    with conn:
+        conn.execute('CREATE INDEX VariantsByPosition ON Variants (CHROM, POS)')
+        conn.execute('CREATE INDEX InfoByKey ON Info (Key)')
+        conn.execute('CREATE INDEX SamplesByVariant ON Samples (VariantID)')
+    conn.close()
+    return n
+    # END SOLUTION
 
 
-                
-    return variants
+def find_variant_in_db(CHROM, REF, ALT, POS, db_file):
+    """
+    find_variant for a database written by save_data_as_db. The variants are looked up 
+    through the (CHROM, POS) index and rebuilt with their INFO and SAMPLE fields, so the 
+    result is the same as find_variant on the JSON file of the same data.
+    """
+    # BEGIN SOLUTION
+    conn = create_connection(db_file)
+    try:
+        rows = conn.execute('SELECT VariantID, CHROM, POS, ID, REF, ALT, QUAL, FILTER, INFO FROM Variants '
+                            'WHERE CHROM = ? AND POS = ? AND REF = ? AND ALT = ? ORDER BY VariantID',
+                            (CHROM, POS, REF, ALT)).fetchall()
+        list1 = []
+        for variant_id, CHROM, POS, ID, REF, ALT, QUAL, FILTER, INFO in rows:
+            samples = conn.execute('SELECT Sample, Data FROM Samples WHERE VariantID = ? ORDER BY rowid',
+                                   (variant_id,))
+            list1.append({'ALT': ALT, 'CHROM': CHROM, 'FILTER': FILTER, 'ID': ID, 'INFO': json.loads(INFO),
+                          'POS': POS, 'QUAL': QUAL, 'REF': REF,
+                          'SAMPLE': {name: json.loads(data) for name, data in samples}})
+        return list1
+    finally:
+        conn.close()
+    # END SOLUTION
 
 
+def iter_predictor_fields_from_db(db_file, weights=None, threshold=None):
+    """
+    iter_predictor_fields for a database written by save_data_as_db: reads the predictor 
+    rows of the Info table through its Key index, joined with the basic fields of their 
+    variant, in file order. The predictors in weights must have been among the info_keys 
+    of the load.
+    """
+    # BEGIN SOLUTION
+    weights = weights or PREDICTOR_WEIGHTS
+    keys = sorted(weights)
+    conn = create_connection(db_file)
+    try:
+        rows = conn.execute('SELECT v.VariantID, v.CHROM, v.POS, v.REF, v.ALT, i.Key, i.Value '
+                            'FROM Info i JOIN Variants v ON v.VariantID = i.VariantID '
+                            'WHERE i.Key IN (%s) ORDER BY i.VariantID' % ', '.join('?' * len(keys)), keys)
+        current = None
+        for variant_id, CHROM, POS, REF, ALT, key, value in rows:
+            if current is None or current[0] != variant_id:
+                if current is not None:
+                    dict1 = _predictor_fields(current[1], weights)
+                    if threshold is None or dict1['sum_predictor_values'] > threshold:
+                        yield dict1
+                current = (variant_id, {'CHROM': CHROM, 'POS': POS, 'REF': REF, 'ALT': ALT, 'INFO': {}})
+            current[1]['INFO'][key] = value
+        if current is not None:
+            dict1 = _predictor_fields(current[1], weights)
+            if threshold is None or dict1['sum_predictor_values'] > threshold:
+                yield dict1
+    finally:
+        conn.close()
+    # END SOLUTION
 
+BGZF_BLOCK_SIZE = 0xff00
+_BGZF_EOF = bytes.fromhex('1f8b08040000000000ff0600424302001b0003000000000000000000')
+
+
+def _bgzf_block(data):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    deflated = compressor.compress(data) + compressor.flush()
+    header = struct.pack('<4BI2BH2BHH', 31, 139, 8, 4, 0, 0, 255, 6, 66, 67, 2, len(deflated) + 25)
+    return header + deflated + struct.pack('<II', zlib.crc32(data), len(data))
+
+
+def _read_bgzf_range(file, start, end):
+    file.seek(start)
+    raw = file.read(end - start)
+    out = []
+    while raw:
+        decompressor = zlib.decompressobj(31)
+        out.append(decompressor.decompress(raw))
+        raw = decompressor.unused_data
+    return b''.join(out)
 
-    pass
 
+def write_bgzf_vcf(vcf_filename, bgzf_filename=None):
+    """
+    Writes a vcf (plain or gzipped) as a BGZF block-compressed file, by default 
+    vcf_filename + '.gz' (or vcf_filename with .bgz for an input that already ends with .gz). 
+    Blocks hold whole lines and never mix chromosomes, and a region index is written next 
+    to the output (bgzf_filename + '.rgi') that maps every chromosome to the position range 
+    and compressed byte range of each group of blocks. The output is still an ordinary 
+    multi-member gzip file, so gzip.open and pull_basic_and_predictor_fields_gzip read it 
+    as before. Returns the name of the BGZF file.
+    """
+    # BEGIN SOLUTION
+    if bgzf_filename is None:
+        bgzf_filename = vcf_filename[:-3] + '.bgz' if vcf_filename.endswith('.gz') else vcf_filename + '.gz'
+    blocks = defaultdict(list)
+    state = {'offset': 0}
+
+    def write_group(out, lines):
+        start = state['offset']
+        data = ''.join(lines).encode('utf-8')
+        for i in range(0, len(data), BGZF_BLOCK_SIZE):
+            block = _bgzf_block(data[i:i + BGZF_BLOCK_SIZE])
+            out.write(block)
+            state['offset'] += len(block)
+        return start, state['offset']
+
+    with _open_vcf(vcf_filename) as fs, open(bgzf_filename, 'wb') as out:
+        header_lines = []
+        group, group_chrom, group_size, first_pos, last_pos = [], None, 0, None, None
+        for line in fs:
+            if not line.strip():
+                continue
+            if not line.endswith('\n'):
+                line += '\n'
+            if line.startswith('#'):
+                header_lines.append(line)
+                continue
+            if header_lines is not None:
+                write_group(out, header_lines)
+                data_offset = state['offset']
+                header_lines = None
+            chrom, pos = line.split('\t', 2)[:2]
+            pos = int(pos)
+            size = len(line.encode('utf-8'))
+            if group and (chrom != group_chrom or group_size + size > BGZF_BLOCK_SIZE):
+                blocks[group_chrom].append((first_pos, last_pos) + write_group(out, group))
+                group, group_size, first_pos, last_pos = [], 0, None, None
+            group.append(line)
+            group_chrom = chrom
+            group_size += size
+            first_pos = pos if first_pos is None else min(first_pos, pos)
+            last_pos = pos if last_pos is None else max(last_pos, pos)
+        if header_lines is not None:
+            write_group(out, header_lines)
+            data_offset = state['offset']
+        if group:
+            blocks[group_chrom].append((first_pos, last_pos) + write_group(out, group))
+        out.write(_BGZF_EOF)
+    with open(bgzf_filename + '.rgi', 'w') as file:
+        json.dump({'data_offset': data_offset, 'blocks': blocks}, file)
+    return bgzf_filename
     # END SOLUTION
 
-def pull_basic_and_predictor_fields_gzip(filename):
+
+def load_region_index(filename):
+    """
+    Loads the region index that write_bgzf_vcf wrote next to a BGZF vcf.
+    """
     # BEGIN SOLUTION
-    import gzip
-    data=[]
-    header=None
-    with gzip.open(filename,'rt') as fp:    
-        for line in fp:
-                line =line.strip()
-                # if len(data)>100:
-                #     break
-                if not line:
-                    continue
-                if line.startswith('##'):
-                    continue
-                if not header:
-                    header=line[1:].split('\t')
-                    continue
-                
-                data.append(create_dict_from_line(header, line))
-                
-        
-                
-    info_field_data = extract_info_field(data)  # extract all the info fields
-    info_field_list = create_dictionary_of_info_field_values(info_field_data)  # create dictionary from info fields
-    info_field_data_type = determine_data_type_of_info_fields(info_field_list)  # Determine data type of each info field
-    data1 = format_data_gzip(data, info_field_data_type)
-    # print(data1)
-    save_data_as_json(data1,'temp_mini_project1_gzip.json')
-    pulleddata=pull_basic_and_predictor_fields('temp_mini_project1_gzip.json')
-    # print(pulleddata)
-    save_data_as_json(pulleddata,'mini_project1_gzip.json')
-    pass  
+    with open(filename + '.rgi', 'r') as file:
+        return json.load(file)
+    # END SOLUTION
+
+
+def parse_region(region):
+    """
+    Turns a region string such as 'chr4:123,000,000-124,000,000', 'chr4:123000000' or 
+    'chr4' into a (chrom, start, end) tuple with inclusive positions. A missing start or end 
+    is returned as None.
+    """
+    # BEGIN SOLUTION
+    chrom, sep, span = region.replace(',', '').partition(':')
+    if not sep or not span:
+        return chrom, None, None
+    start, dash, end = span.partition('-')
+    start = int(start) if start else None
+    end = (int(end) if end else None) if dash else start
+    return chrom, start, end
+    # END SOLUTION
+
+
+def _region_chrom(blocks, chrom):
+    if chrom in blocks:
+        return chrom
+    alternative = chrom[3:] if chrom.startswith('chr') else 'chr' + chrom
+    return alternative if alternative in blocks else None
 
+
+def iter_vcf_region(filename, region, lazy=False, fields=None, where=None):
+    """
+    Yields the variant dictionaries (as built by create_dict_from_line) of a BGZF vcf 
+    written by write_bgzf_vcf whose CHROM and POS fall inside region. Only the header 
+    blocks and the blocks whose position range overlaps the region are decompressed. 
+    The chromosome may be given with or without the 'chr' prefix. lazy, fields and where 
+    work as in iter_vcf.
+    """
+    # BEGIN SOLUTION
+    index = load_region_index(filename)
+    chrom, start, end = parse_region(region)
+    with open(filename, 'rb') as file:
+        header = _read_bgzf_range(file, 0, index['data_offset']).decode('utf-8')
+        schema = _read_vcf_header(header.split('\n'))
+        chrom = _region_chrom(index['blocks'], chrom)
+        if schema is None or chrom is None:
+            return
+        parser = schema if fields is None else schema.projection(fields)
+        for first_pos, last_pos, block_start, block_end in index['blocks'][chrom]:
+            if (end is not None and first_pos > end) or (start is not None and last_pos < start):
+                continue
+            text = _read_bgzf_range(file, block_start, block_end).decode('utf-8')
+            for line in _iter_data_lines(text.split('\n')):
+                pos = int(line.split('\t', 2)[1])
+                if (start is None or pos >= start) and (end is None or pos <= end) and \
+                        (where is None or where.matches(line)):
+                    yield parser.parse_line(line, lazy)
     # END SOLUTION
 
+
+_CONTIG_ID = re.compile(r'##contig=<ID=([^,>]+)')
+
+
+def _vcf_chrom_order(filename):
+    # the chromosomes of a vcf in the order their lines first appear
+    order = {}
+    with _open_vcf(filename) as fs:
+        _read_vcf_meta(fs)
+        for line in _iter_data_lines(fs):
+            order.setdefault(line.partition('\t')[0], None)
+    return list(order)
+
+
+def _merge_chrom_orders(orders):
+    # rank of every chromosome in one order that keeps the order of every list, taking the 
+    # chromosome seen first whenever the lists leave a choice
+    first_seen = {}
+    after = defaultdict(set)
+    n_before = defaultdict(int)
+    for order in orders:
+        for chrom in order:
+            first_seen.setdefault(chrom, len(first_seen))
+        for a, b in zip(order, order[1:]):
+            if b not in after[a]:
+                after[a].add(b)
+                n_before[b] += 1
+    names = list(first_seen)
+    ready = [i for i, chrom in enumerate(names) if not n_before[chrom]]
+    heapq.heapify(ready)
+    ranks = {}
+    while ready:
+        chrom = names[heapq.heappop(ready)]
+        ranks[chrom] = len(ranks)
+        for b in after[chrom]:
+            n_before[b] -= 1
+            if not n_before[b]:
+                heapq.heappush(ready, first_seen[b])
+    if len(ranks) < len(names):
+        raise ValueError('the files order their chromosomes differently: %s' %
+                         ', '.join(chrom for chrom in names if chrom not in ranks))
+    return ranks
+
+
+def _read_vcf_meta(fs):
+    meta = []
+    for line in fs:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('##'):
+            meta.append(line)
+            continue
+        return meta, line[1:].split('\t')
+    return meta, None
+
+
+def _iter_sorted_lines(filename, fs, chrom_key):
+    # (sort key, columns) of every data line, checking that the file is sorted
+    last = None
+    for line in _iter_data_lines(fs):
+        columns = line.split('\t')
+        key = (chrom_key(columns[0]), int(columns[1]))
+        if last is not None and key < last:
+            raise ValueError('%s is not sorted by position at %s:%s' % (filename, columns[0], columns[1]))
+        last = key
+        yield key, columns
+
+
+def _merge_group(members, n_samples, positions):
+    # members are (file index, columns) lines with the same CHROM, POS, REF and ALT, at 
+    # most one per file; the sample columns go to their place in the merged header
+    columns = members[0][1][:8]
+    if not n_samples:
+        return '\t'.join(columns)
+    formats = [member[8] for _, member in members if len(member) > 8]
+    if not formats:
+        format_keys = ['GT']
+    elif all(f == formats[0] for f in formats):
+        format_keys = None
+        columns.append(formats[0])
+    else:
+        format_keys = []
+        for f in formats:
+            format_keys.extend(k for k in f.split(':') if k not in format_keys)
+    if format_keys is not None:
+        columns.append(':'.join(format_keys))
+    samples = ['.'] * n_samples
+    for i, member in members:
+        if len(member) <= 8:
+            continue
+        keys = member[8].split(':')
+        for position, value in zip(positions[i], member[9:]):
+            if format_keys is not None:
+                fields = dict(zip(keys, value.split(':')))
+                value = ':'.join(fields.get(k, '.') for k in format_keys)
+            samples[position] = value
+    return '\t'.join(columns + samples)
+
+
+def iter_merged_vcf_lines(filenames):
+    """
+    Streaming k-way merge of position-sorted vcf files (plain or gzipped). Yields the lines 
+    (without newline) of one vcf: the union of the meta lines, a header whose sample columns 
+    are the samples of every file, file after file, and the data lines 
+    of every file in (CHROM, POS) order. The chromosome order of a file is taken from the 
+    ##contig lines of its header or, when it has none, from the order its lines list them 
+    in (read in a first pass over the file). The orders of all the files are combined into 
+    one, so lexicographic (1, 10, 2) and natural (1, 2, 10) inputs both merge, and a 
+    ValueError is raised when two files order their chromosomes differently. Only one 
+    line per file is held in a heap, plus the lines at the current position, so memory 
+    does not depend on the size of the files. Lines of different files with the same 
+    CHROM, POS, REF and ALT become one line, with the fixed columns of the first file and 
+    the samples of all of them (FORMAT keys are unioned when they differ); a sample that 
+    a line does not have is written as '.'. A ValueError is raised when a file turns out not 
+    to be sorted, or when a sample name is in more than one file (as bcftools merge does 
+    without --force-samples), since their values would overwrite each other.
+    """
+    # BEGIN SOLUTION
+    from contextlib import ExitStack
+    with ExitStack() as stack:
+        files = [stack.enter_context(_open_vcf(filename)) for filename in filenames]
+        metas, headers = zip(*[_read_vcf_meta(fs) for fs in files]) if files else ((), ())
+        meta = list(dict.fromkeys(line for lines in metas for line in lines))
+        meta.sort(key=lambda line: not line.startswith('##fileformat'))
+        orders = []
+        for filename, lines, header in zip(filenames, metas, headers):
+            contigs = [match.group(1) for match in map(_CONTIG_ID.match, lines) if match]
+            if contigs:
+                orders.append(list(dict.fromkeys(contigs)))
+            elif header is not None:
+                orders.append(_vcf_chrom_order(filename))
+        ranks = _merge_chrom_orders(orders)
+
+        def chrom_key(chrom):
+            # a chromosome missing from the ##contig lines of its file goes after the others
+            rank = ranks.get(chrom)
+            if rank is None:
+                rank = ranks[chrom] = len(ranks)
+            return rank
+
+        sample_files = {}
+        for filename, header in zip(filenames, headers):
+            for name in header[9:] if header is not None else ():
+                if name in sample_files:
+                    raise ValueError('sample %s is in both %s and %s' % (name, sample_files[name], filename))
+                sample_files[name] = filename
+        sample_names = list(sample_files)
+        sample_index = {name: i for i, name in enumerate(sample_names)}
+        positions = [[sample_index[name] for name in header[9:]] if header else [] for header in headers]
+
+        yield from meta
+        fixed = ['#CHROM', 'POS', 'ID', 'REF', 'ALT', 'QUAL', 'FILTER', 'INFO']
+        yield '\t'.join(fixed + ['FORMAT'] + sample_names if sample_names else fixed)
+
+        heap = []
+        readers = []
+        for i, (filename, fs, header) in enumerate(zip(filenames, files, headers)):
+            reader = _iter_sorted_lines(filename, fs, chrom_key) if header is not None else iter(())
+            readers.append(reader)
+            for key, columns in reader:
+                heap.append((key, i, columns))
+                break
+        heapq.heapify(heap)
+        while heap:
+            key = heap[0][0]
+            lines = []
+            while heap and heap[0][0] == key:
+                _, i, columns = heapq.heappop(heap)
+                lines.append((i, columns))
+                for next_key, next_columns in readers[i]:
+                    heapq.heappush(heap, (next_key, i, next_columns))
+                    break
+            groups = []
+            for i, columns in lines:
+                for group in groups:
+                    if group[0][1][3:5] == columns[3:5] and all(j != i for j, _ in group):
+                        group.append((i, columns))
+                        break
+                else:
+                    groups.append([(i, columns)])
+            for group in groups:
+                yield _merge_group(group, len(sample_names), positions)
+    # END SOLUTION
+
+
+def iter_merged_vcf(filenames, lazy=False):
+    """
+    Yields the variant dictionaries of the merge of filenames made by 
+    iter_merged_vcf_lines, in position order. lazy works as in iter_vcf.
+    """
+    # BEGIN SOLUTION
+    lines = iter_merged_vcf_lines(filenames)
+    schema = _read_vcf_header(lines)
+    if schema is None:
+        return
+    for line in _iter_data_lines(lines):
+        yield schema.parse_line(line, lazy)
+    # END SOLUTION
+
+
+def merge_vcf_files(filenames, output):
+    """
+    Writes the merge of filenames made by iter_merged_vcf_lines to output, gzipped when 
+    output ends with .gz. Returns the number of data lines written.
+    """
+    # BEGIN SOLUTION
+    n = 0
+    opener = gzip.open if output.endswith('.gz') else open
+    with opener(output, 'wt') as out:
+        for line in iter_merged_vcf_lines(filenames):
+            out.write(line)
+            out.write('\n')
+            if not line.startswith('#'):
+                n += 1
+    return n
+    # END SOLUTION
+
+
+def predictor_fields_from_vcf(filename, region=None, workers=1, weights=None, threshold=None, fields=None,
+                              where=None, profile=None, threaded=True):
+    """
+    Fused version of the gzip pipeline. Goes from the lines of a vcf (plain or gzipped) 
+    straight to the basic and predictor fields, without formatting every info field or 
+    writing and re-reading an intermediate JSON file. Lines are parsed with a FieldProjection 
+    of CHROM, POS, REF, ALT and the predictor keys, so sample columns and other info fields 
+    are never split. The predictor data types are tracked while the file is read, and the 
+    values are cast and scored at the end. POS is left as a string, as format_data_gzip 
+    does. region and workers work as in pull_basic_and_predictor_fields_gzip, and weights 
+    and threshold as in iter_predictor_fields. fields adds more columns to every output 
+    record: fixed columns are copied as strings, 'INFO/<key>' fields are cast like the 
+    predictors, and sample fields are copied under SAMPLE. Only the lines accepted by 
+    where, a VariantFilter, are parsed. profile, a PipelineProfile, records the decompress, 
+    filter and parse stages of a serial read and the score stage. A gzipped file read 
+    serially is decompressed in a background thread (see ThreadedGzipReader) unless 
+    threaded=False. Returns the list of predictor dictionaries.
+    """
+    # BEGIN SOLUTION
+    weights = weights or PREDICTOR_WEIGHTS
+    basic = ['CHROM', 'POS', 'REF', 'ALT']
+    extra = [field for field in fields or () if field not in basic]
+    projection = basic + ['INFO/' + pred for pred in weights] + extra
+    extra_fixed = [field for field in extra if '/' not in field and field not in ('INFO', 'SAMPLE')]
+    if region is not None:
+        data = iter_vcf_region(filename, region, fields=projection, where=where)
+    elif workers != 1:
+        data = parse_vcf_parallel(filename, workers, projection, where)[0]
+    else:
+        data = iter_vcf(filename, fields=projection, where=where, profile=profile, threaded=threaded)
+    tracker = InfoFieldTypeTracker()
+    rows = []
+    mark = len(profile.events) if profile is not None else 0
+    start = time.perf_counter()
+    n_records = 0
+    for n_records, record in enumerate(data, 1):
+        info = record.get('INFO')
+        if info is None:
+            continue
+        if extra:
+            # the types of the extra info fields come from every record, as in format_data
+            tracker.update(info)
+        values = {}
+        for pred in weights:
+            value = _info_raw_value(info, pred)
+            if value is not None:
+                values[pred] = value
+                tracker.update_value(pred, value)
+        if values:
+            extras = None
+            if extra:
+                extras = {'fixed': {k: record[k] for k in extra_fixed if k in record},
+                          'info': info, 'SAMPLE': record.get('SAMPLE')}
+            rows.append((record['CHROM'], record['POS'], record['REF'], record['ALT'], values, extras))
+    if profile is not None:
+        # the time spent inside the reader was already recorded by its own stages
+        inner = sum(event['seconds'] for event in profile.events[mark:])
+        profile.add('infer_types', time.perf_counter() - start - inner, records_in=n_records, records_out=len(rows))
+    data_types = tracker.data_types
+    variants = []
+    with _stage(profile, 'score') as stage:
+        for CHROM, POS, REF, ALT, values, extras in rows:
+            info = {k: data_types[k](v) for k, v in values.items()}
+            dict1 = _predictor_fields({'CHROM': CHROM, 'POS': POS, 'REF': REF, 'ALT': ALT, 'INFO': info}, weights)
+            if threshold is not None and not dict1['sum_predictor_values'] > threshold:
+                continue
+            if extras is not None:
+                dict1.update(extras['fixed'])
+                for item in extras['info'].split(';'):
+                    k, sep, v = item.partition('=')
+                    if sep and v != '.' and k not in weights:
+                        dict1[k] = data_types[k](v)
+                if extras['SAMPLE'] is not None:
+                    dict1['SAMPLE'] = extras['SAMPLE']
+            variants.append(dict1)
+        stage.records_in = len(rows)
+        stage.records_out = len(variants)
+    return variants
+    # END SOLUTION
+
+
+def pull_basic_and_predictor_fields_gzip(filename, region=None, workers=1, fields=None, where=None, profile=None):
+    """
+    Parses a gzipped vcf and writes the basic and predictor fields of every variant that 
+    has a predictor to mini_project1_gzip.json, using the fused predictor_fields_from_vcf 
+    pipeline. When region is given (for example 'chr4:123,000,000-124,000,000') the file 
+    must have been written by write_bgzf_vcf and only the blocks overlapping the region are 
+    decompressed. With workers other than 1 a BGZF file is parsed in parallel by 
+    parse_vcf_parallel. fields adds more columns to the output and where filters the 
+    lines, as in predictor_fields_from_vcf. profile, a PipelineProfile, records every stage 
+    up to the JSON output.
+    """
+    # BEGIN SOLUTION
+    pulleddata = predictor_fields_from_vcf(filename, region, workers, fields=fields, where=where, profile=profile)
+    save_data_as_json(pulleddata,'mini_project1_gzip.json', profile=profile)
+    # END SOLUTION
+
+class PredictorQuery:
+    """
+    Single-pass query over predictor records (the output of pull_basic_and_predictor_fields 
+    or predictor_fields_from_vcf). filter(data) yields the records whose key 
+    (sum_predictor_values by default) is greater than threshold (every record when 
+    threshold is None) and, in the same pass, keeps the top_k records with the highest 
+    scores in a bounded heap, so neither the input nor the records below the top are held 
+    in memory. After the pass, top() returns those records from best to worst (ties keep 
+    file order) and count is the number of records yielded.
+    """
+
+    def __init__(self, threshold=0, top_k=None, key='sum_predictor_values'):
+        self.threshold = threshold
+        self.top_k = top_k
+        self.key = key
+        self.count = 0
+        self._heap = []
+
+    def filter(self, data):
+        threshold = self.threshold
+        top_k = self.top_k
+        key = self.key
+        heap = self._heap
+        for seq, record in enumerate(data):
+            score = record[key]
+            if top_k:
+                # -seq makes the later of two equal scores the smaller item, so it goes first
+                item = (score, -seq, record)
+                if len(heap) < top_k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+            if threshold is None or score > threshold:
+                self.count += 1
+                yield record
+
+    def top(self):
+        return [record for _, _, record in sorted(self._heap, key=lambda item: item[:2], reverse=True)]
+
+
+def query_predictor_values(filename='mini_project1_gzip.json', threshold=0, top_k=None,
+                           output='sum_predictor_values_gt_zero.json', top_output=None):
+    """
+    Streams the predictor records of filename (a JSON array or JSON Lines file) once, 
+    writes the records whose sum_predictor_values is greater than threshold to output and, 
+    when top_k is given, the top_k records by sum_predictor_values to top_output. A .jsonl 
+    output is written while the input is read; a JSON array output holds only the selected 
+    records. Set output to None to only compute the top k. Returns the PredictorQuery, 
+    whose count and top() give the results.
+    """
+    # BEGIN SOLUTION
+    query = PredictorQuery(threshold, top_k)
+    selected = query.filter(iter_data_from_json(filename))
+    if output is None:
+        for _ in selected:
+            pass
+    elif output.endswith(('.jsonl', '.ndjson')):
+        save_data_as_json(selected, output)
+    else:
+        save_data_as_json(list(selected), output)
+    if top_k and top_output is not None:
+        save_data_as_json(query.top(), top_output)
+    return query
+    # END SOLUTION
+
+
 def return_all_non_zero_sum_predictor_values():
 
     # BEGIN SOLUTION
-    filename='mini_project1_gzip.json'
-    x=[]
-    data=load_data_from_json(filename)
-    for v in data:
-        if v['sum_predictor_values'] > 0:
-            x.append(v)
-    save_data_as_json(x,'sum_predictor_values_gt_zero.json')
-    pass
+    query_predictor_values('mini_project1_gzip.json', 0, output='sum_predictor_values_gt_zero.json')
     # END SOLUTION
               
-def format_data_gzip(data, info_field_data_type):
-    from collections import defaultdict
-    dict1=defaultdict(str)
-    dict2=defaultdict(str)
-    dict_list=[]
-    for info in data:
-        dict2=defaultdict(str)
-        for key in info.keys():
-            if key == 'INFO': 
-                dict1=defaultdict(str)
-                for value in info['INFO'].split(';'):  
-                    if len(value.split('=',1))>1 and value.split('=',1)[1] !='.':
-                        k,v= value.split('=',1)
-                        dict1[k]=info_field_data_type[k](v)
-                dict2[key]=dict1
-            else:
-                dict2[key]=info[key]
-        dict_list.append(dict2)
-    return dict_list
\ No newline at end of file
+def format_data_gzip(data, info_field_data_type, intern=True, symbols=None):
+    if intern and symbols is None:
+        symbols = SymbolTable()
+    return list(iter_format_data(data, info_field_data_type, cast_pos_qual=False, symbols=symbols if intern else None))
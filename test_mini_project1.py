@@ -0,0 +1,108 @@
+import gzip
+
+import pytest
+
+import mini_project1
+
+
+VCF = ('##fileformat=VCFv4.2\n'
+       '#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tXG102\n'
+       '4\t100\t.\tA\tG\t23.25\tPASS\tSIFT_pred=D;AF=0.5\tGT:DP\t0/1:59\n'
+       '4\t200\t.\tC\tT\t10.5\tPASS\tSIFT_pred=T;AF=0.25\tGT:DP\t1/1:12\n')
+
+
+def test_threaded_gzip_reader_skips_nul_padding(tmp_path):
+    filename = str(tmp_path / 'padded.vcf.gz')
+    with open(filename, 'wb') as file:
+        file.write(gzip.compress(VCF[:60].encode()) + b'\x00' * 3 + gzip.compress(VCF[60:].encode()) + b'\x00' * 4)
+    with gzip.open(filename, 'rt') as file:
+        expected = file.read().splitlines()
+    with mini_project1.ThreadedGzipReader(filename, batch_bytes=7) as reader:
+        assert list(reader) == expected
+    assert mini_project1.read_vcf_file(filename) == list(mini_project1.iter_vcf(filename, threaded=True))
+
+
+def test_mapped_vcf_matches_text_reader(tmp_path):
+    filename = str(tmp_path / 'plain.vcf')
+    with open(filename, 'w', newline='') as file:
+        file.write(VCF.replace('\n', '\r\n'))
+    where = mini_project1.VariantFilter(info={'SIFT_pred': 'D', 'AF': ('>', 0.1)})
+    for fields in (None, ['CHROM', 'POS', 'INFO/SIFT_pred', 'FORMAT/GT']):
+        assert mini_project1.read_vcf_file(filename, fields=fields, where=where, mmap=True) == \
+            mini_project1.read_vcf_file(filename, fields=fields, where=where)
+
+
+def test_json_round_trip(tmp_path):
+    records = [{'CHROM': '4', 'POS': 100}, {'CHROM': '4', 'POS': 200}]
+    for name, data, jsonl in (('array.json', records, None), ('object.json', {'a': 1}, None),
+                              ('empty.json', {}, None), ('lines.json', records, True),
+                              ('lines.jsonl', records, None)):
+        filename = str(tmp_path / name)
+        mini_project1.save_data_as_json(data, filename, jsonl=jsonl)
+        assert mini_project1.load_data_from_json(filename) == data
+
+
+def _write_vcf(path, samples, lines):
+    header = ['#CHROM', 'POS', 'ID', 'REF', 'ALT', 'QUAL', 'FILTER', 'INFO', 'FORMAT'] + samples
+    with open(str(path), 'w') as file:
+        file.write('##fileformat=VCFv4.2\n' + '\t'.join(header) + '\n')
+        for chrom, pos, gt in lines:
+            file.write('\t'.join([chrom, str(pos), '.', 'A', 'G', '50', 'PASS', 'DP=10', 'GT', gt]) + '\n')
+    return str(path)
+
+
+def test_merge_keeps_the_chromosome_order_of_the_inputs(tmp_path):
+    d1 = _write_vcf(tmp_path / 'd1.vcf', ['S1'], [('1', 5, '0/1'), ('10', 3, '0/1'), ('2', 7, '0/1')])
+    d2 = _write_vcf(tmp_path / 'd2.vcf', ['S2'], [('1', 6, '1/1'), ('2', 1, '1/1')])
+    merged = [(r['CHROM'], r['POS']) for r in mini_project1.iter_merged_vcf([d1, d2])]
+    assert merged == [('1', '5'), ('1', '6'), ('10', '3'), ('2', '1'), ('2', '7')]
+    d3 = _write_vcf(tmp_path / 'd3.vcf', ['S3'], [('2', 1, '1/1'), ('10', 1, '1/1')])
+    with pytest.raises(ValueError):
+        list(mini_project1.iter_merged_vcf([d1, d3]))
+
+
+def test_merge_rejects_duplicate_samples(tmp_path):
+    d1 = _write_vcf(tmp_path / 'd1.vcf', ['S1'], [('1', 5, '0/1')])
+    d2 = _write_vcf(tmp_path / 'd2.vcf', ['S1'], [('1', 5, '1/1')])
+    with pytest.raises(ValueError):
+        list(mini_project1.iter_merged_vcf_lines([d1, d2]))
+
+
+def test_extra_info_types_come_from_every_record(tmp_path):
+    filename = str(tmp_path / 'types.vcf')
+    with open(filename, 'w') as file:
+        file.write(VCF.replace('SIFT_pred=D;AF=0.5', 'SIFT_pred=D;AF=1').replace('SIFT_pred=T;AF=0.25', 'AF=0.5'))
+    variants = mini_project1.predictor_fields_from_vcf(filename, fields=['INFO/AF'])
+    assert len(variants) == 1 and isinstance(variants[0]['AF'], float)
+
+
+def test_iter_variants_keeps_values_ending_in_dot(tmp_path):
+    filename = str(tmp_path / 'dots.vcf')
+    with open(filename, 'w') as file:
+        file.write(VCF.replace('SIFT_pred=D;', 'SIFT_pred=D;GeneDetail=dist=.;Func=.;'))
+    data = mini_project1.read_vcf_file(filename)
+    data_types = mini_project1.infer_info_field_data_types(mini_project1.iter_info_field(data))
+    formatted = mini_project1.format_data(data, data_types)
+    variants = list(mini_project1.iter_variants(filename, data_types))
+    assert [dict(v.INFO) for v in variants] == [record['INFO'] for record in formatted]
+    assert variants[0].INFO['GeneDetail'] == 'dist=.'
+
+
+def test_db_matches_json(tmp_path):
+    filename = str(tmp_path / 'plain.vcf')
+    with open(filename, 'w') as file:
+        file.write(VCF)
+    data = mini_project1.read_vcf_file(filename)
+    data_types = mini_project1.infer_info_field_data_types(mini_project1.iter_info_field(data))
+    for name, records in (('format_data', mini_project1.format_data(data, data_types)),
+                          ('format_data_gzip', mini_project1.format_data_gzip(data, data_types))):
+        json_file = str(tmp_path / (name + '.json'))
+        db_file = str(tmp_path / (name + '.db'))
+        mini_project1.save_data_as_json(records, json_file)
+        mini_project1.save_data_as_db(records, db_file)
+        for record in records:
+            for POS in (record['POS'], int(record['POS']), str(record['POS'])):
+                args = (record['CHROM'], record['REF'], record['ALT'], POS)
+                assert mini_project1.find_variant(*args, db_file) == mini_project1.find_variant(*args, json_file)
+            args = (record['CHROM'], record['REF'], record['ALT'], record['POS'])
+            assert mini_project1.find_variant(*args, db_file) == [record]